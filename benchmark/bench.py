@@ -0,0 +1,294 @@
+import argparse
+import contextlib
+import functools
+import importlib.util
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from scenarios import SCENARIOS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LocalService:
+    """Imports a service's app.py and serves it on 127.0.0.1 from a background thread."""
+
+    def __init__(self, service):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietRequestHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        module = load_app_module(service)
+        start_worker = getattr(module, 'start_worker', None)
+        if start_worker is not None:
+            start_worker()
+
+        self.server = make_server('127.0.0.1', 0, module.app, threaded=True, request_handler=QuietRequestHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"bench-{service.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def load_app_module(service):
+    """
+    Load <service.path>/app.py under a unique module name, with its directory
+    on sys.path for sibling imports. Services ship same-named helper modules
+    (metrics, compression, ...), so any loaded by an earlier service are
+    dropped from sys.modules first; otherwise this one would share them.
+    """
+    service_dir = os.path.join(REPO_ROOT, service.path)
+    for filename in os.listdir(service_dir):
+        if filename.endswith('.py'):
+            sys.modules.pop(filename[:-3], None)
+    sys.path.insert(0, service_dir)
+    spec = importlib.util.spec_from_file_location(f"{service.path.replace('/', '_')}_app", os.path.join(service_dir, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def use_fake_redis():
+    """Back every redis connection pool with one in-memory fakeredis server."""
+    import fakeredis
+    import redis
+
+    server = fakeredis.FakeServer()
+    redis.BlockingConnectionPool = functools.partial(
+        redis.BlockingConnectionPool,
+        connection_class=fakeredis.FakeConnection,
+        server=server
+    )
+
+
+def start_local_services(services):
+    """Start the services in order, pointing each one's env at the ones started before it."""
+    started = {}
+    for service in services:
+        for variable, target in service.env.items():
+            os.environ[variable] = started[target].url
+        started[service.name] = LocalService(service)
+    return started
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0,
+        "rps": round(count / elapsed, 2) if elapsed else 0,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / count) if count else None,
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(latencies[-1]) if count else None
+        }
+    }
+
+
+def run_load(url, endpoint, concurrency, duration, rate, timeout):
+    """
+    Drive one endpoint for duration seconds and return (latencies, errors, elapsed).
+
+    Without a rate, each of the concurrency workers sends its next request as
+    soon as the previous one returns (closed loop). With a rate, requests are
+    scheduled at fixed intervals across all workers and latency is measured
+    from the scheduled start, so time spent queued behind a slow response is
+    counted instead of hidden.
+    """
+    lock = threading.Lock()
+    latencies = []
+    errors = [0]
+    sent = [0]
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    def next_slot():
+        with lock:
+            slot = started + sent[0] / rate
+            sent[0] += 1
+            return slot
+
+    def worker():
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        while True:
+            if rate:
+                scheduled = next_slot()
+                if scheduled >= stop_at:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= stop_at:
+                    break
+
+            try:
+                response = session.request(endpoint.method, url, json=endpoint.body, timeout=timeout)
+                response.content
+                failed = response.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            local_latencies.append(time.perf_counter() - scheduled)
+            if failed:
+                local_errors += 1
+
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+        session.close()
+
+    threads = [threading.Thread(target=worker, name=f"bench-load-{index}") for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def compare(results, baseline):
+    """Percent change of rps and latency percentiles against a previous run, per endpoint."""
+    comparison = {}
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+
+        def change(new, old):
+            return round((new - old) / old * 100, 2) if new is not None and old else None
+
+        comparison[name] = {
+            "rps_change_pct": change(current['rps'], previous['rps']),
+            "error_rate_change": round(current['error_rate'] - previous['error_rate'], 4)
+        }
+        for key in ('p50', 'p95', 'p99'):
+            comparison[name][f"{key}_change_pct"] = change(current['latency_ms'][key], previous['latency_ms'][key])
+    return comparison
+
+
+def parse_urls(values):
+    urls = {}
+    for value in values or []:
+        name, url = value.split('=', 1)
+        urls[name] = url.rstrip('/')
+    return urls
+
+
+def run_scenario(scenario, endpoints, args):
+    """Benchmark each endpoint in turn; returns (results, started_at)."""
+    local_services = {}
+    if args.local:
+        if args.fake_redis:
+            use_fake_redis()
+        local_services = start_local_services(scenario['services'])
+        urls = {name: service.url for name, service in local_services.items()}
+    else:
+        urls = {service.name: service.url for service in scenario['services']}
+    urls.update(parse_urls(args.url))
+
+    started_at = datetime.now().isoformat()
+    results = {}
+    try:
+        for endpoint in endpoints:
+            url = urls[endpoint.service] + endpoint.path
+            print(f"Benchmarking {endpoint.name}: {endpoint.method} {url}", file=sys.stderr)
+            if args.warmup > 0:
+                run_load(url, endpoint, args.concurrency, args.warmup, args.rate, args.timeout)
+            latencies, errors, elapsed = run_load(url, endpoint, args.concurrency, args.duration, args.rate, args.timeout)
+            results[endpoint.name] = dict(summarize(latencies, errors, elapsed), method=endpoint.method, url=url)
+    finally:
+        for service in local_services.values():
+            service.stop()
+    return results, started_at
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the desafio services and print the results as JSON.")
+    parser.add_argument('desafio', choices=sorted(SCENARIOS))
+    parser.add_argument('--local', action='store_true', help="start the services in-process instead of using running containers")
+    parser.add_argument('--fake-redis', action='store_true', help="with --local, back Redis with fakeredis")
+    parser.add_argument('--url', action='append', metavar='SERVICE=URL', help="override a service address")
+    parser.add_argument('--endpoint', action='append', help="benchmark only these endpoints (repeatable)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per endpoint")
+    parser.add_argument('--rate', type=float, default=0, help="requests per second per endpoint; 0 = as fast as possible")
+    parser.add_argument('--warmup', type=float, default=1.0, help="seconds of unrecorded load per endpoint")
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--output', help="write the JSON here instead of stdout")
+    parser.add_argument('--baseline', help="previous JSON output to compare against")
+    args = parser.parse_args(argv)
+
+    scenario = SCENARIOS[args.desafio]
+    endpoints = scenario['endpoints']
+    if args.endpoint:
+        unknown = set(args.endpoint) - {endpoint.name for endpoint in endpoints}
+        if unknown:
+            parser.error(f"unknown endpoints for {args.desafio}: {', '.join(sorted(unknown))}")
+        endpoints = [endpoint for endpoint in endpoints if endpoint.name in args.endpoint]
+
+    # The services' own prints must not end up in the JSON on stdout.
+    with contextlib.redirect_stdout(sys.stderr):
+        results, started_at = run_scenario(scenario, endpoints, args)
+
+    report = {
+        "desafio": args.desafio,
+        "mode": "local" if args.local else "remote",
+        "started_at": started_at,
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "rate": args.rate,
+            "warmup": args.warmup,
+            "timeout": args.timeout,
+            "fake_redis": args.fake_redis
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "results": results
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report["comparison"] = compare(results, json.load(baseline_file))
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
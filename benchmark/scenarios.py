@@ -0,0 +1,90 @@
+from collections import namedtuple
+
+# name: key used on the command line (--url name=...) and in the results
+# path: service directory relative to the repository root (for --local)
+# url: default address of the service published by docker compose
+# env: environment variables pointing at other services, filled in with
+#      their local URLs before the app is imported (for --local)
+Service = namedtuple('Service', ['name', 'path', 'url', 'env'])
+Endpoint = namedtuple('Endpoint', ['name', 'service', 'method', 'path', 'body'])
+
+
+def endpoint(name, service, path, method='GET', body=None):
+    return Endpoint(name, service, method, path, body)
+
+
+SCENARIOS = {
+    "desafio1": {
+        "services": [
+            Service('server', 'desafio1/server', 'http://localhost:8080', {})
+        ],
+        "endpoints": [
+            endpoint('index', 'server', '/'),
+            endpoint('status', 'server', '/status')
+        ]
+    },
+    "desafio2": {
+        "services": [
+            Service('app', 'desafio2/app', 'http://localhost:5000', {})
+        ],
+        "endpoints": [
+            endpoint('users', 'app', '/users'),
+            endpoint('users_page', 'app', '/users?limit=50'),
+            endpoint('logs_page', 'app', '/logs?limit=50'),
+            endpoint('users_stream', 'app', '/users?stream=ndjson'),
+            endpoint('status', 'app', '/status')
+        ]
+    },
+    "desafio3": {
+        "services": [
+            Service('web', 'desafio3/web', 'http://localhost:5000', {})
+        ],
+        "endpoints": [
+            endpoint('posts_page', 'web', '/api/posts?limit=20'),
+            endpoint('posts_cache_page', 'web', '/api/posts/cache?limit=20'),
+            endpoint('posts_cache', 'web', '/api/posts/cache'),
+            endpoint('counter', 'web', '/api/counter'),
+            endpoint('stats', 'web', '/api/stats'),
+            endpoint('status', 'web', '/status')
+        ]
+    },
+    "desafio4": {
+        "services": [
+            Service('serva', 'desafio4/serva', 'http://localhost:5001', {}),
+            Service('servb', 'desafio4/servb', 'http://localhost:5002', {"SERVICE_A_URL": 'serva'})
+        ],
+        "endpoints": [
+            endpoint('serva_users', 'serva', '/api/users'),
+            endpoint('serva_user', 'serva', '/api/users/1'),
+            endpoint('serva_statistics', 'serva', '/api/users/statistics/summary'),
+            endpoint('servb_formatted', 'servb', '/api/users/formatted'),
+            endpoint('servb_report', 'servb', '/api/users/report'),
+            endpoint('servb_report_stream', 'servb', '/api/users/report?stream=ndjson'),
+            endpoint('servb_details', 'servb', '/api/users/1/details'),
+            endpoint('servb_health', 'servb', '/health')
+        ]
+    },
+    "desafio5": {
+        "services": [
+            Service('users', 'desafio5/users', 'http://localhost:5001', {}),
+            Service('pedidos', 'desafio5/pedidos', 'http://localhost:5002', {}),
+            Service('gateway', 'desafio5/gateway', 'http://localhost:5000', {
+                "USERS_SERVICE_URL": 'users',
+                "ORDERS_SERVICE_URL": 'pedidos'
+            })
+        ],
+        "endpoints": [
+            endpoint('users', 'gateway', '/users'),
+            endpoint('user', 'gateway', '/users/1'),
+            endpoint('users_stats', 'gateway', '/users/stats'),
+            endpoint('orders', 'gateway', '/orders'),
+            endpoint('orders_stats', 'gateway', '/orders/stats'),
+            endpoint('orders_batch', 'gateway', '/orders/batch', 'POST', {"user_ids": [1, 2, 3]}),
+            endpoint('dashboard', 'gateway', '/dashboard'),
+            endpoint('users_with_orders', 'gateway', '/users-with-orders'),
+            endpoint('health', 'gateway', '/health'),
+            endpoint('users_direct', 'users', '/api/users'),
+            endpoint('orders_direct', 'pedidos', '/api/orders')
+        ]
+    }
+}
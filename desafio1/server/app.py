@@ -1,8 +1,16 @@
 from flask import Flask, jsonify
 from datetime import datetime
 from typing import Dict, Any
+import os
+
+from compression import use_compression
+from metrics import instrument
+from serialization import use_json_codec
 
 app = Flask(__name__)
+instrument(app)
+json_codec = use_json_codec(app, os.getenv('JSON_BACKEND', 'auto'))
+use_compression(app, int(os.getenv('COMPRESSION_MIN_SIZE', 1024)), int(os.getenv('COMPRESSION_LEVEL', 6)))
 
 
 @app.route('/')
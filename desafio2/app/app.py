@@ -1,10 +1,21 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from datetime import datetime
+from collections import namedtuple
 import os
 
+from bulk import BulkInsert, read_rows
+from compression import use_compression
+from db_pool import ConnectionPool
+from metrics import instrument, registry
+from projection import parse_fields
+from serialization import use_json_codec
+
 app = Flask(__name__)
+instrument(app)
+json_codec = use_json_codec(app, os.getenv('JSON_BACKEND', 'auto'))
+use_compression(app, int(os.getenv('COMPRESSION_MIN_SIZE', 1024)), int(os.getenv('COMPRESSION_LEVEL', 6)))
 
 DB_HOST = os.getenv('DB_HOST', 'db')
 DB_USER = os.getenv('DB_USER', 'usuario')
@@ -12,38 +23,212 @@ DB_PASSWORD = os.getenv('DB_PASSWORD', 'senha123')
 DB_NAME = os.getenv('DB_NAME', 'aplicacao')
 DB_PORT = os.getenv('DB_PORT', '5432')
 
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))
+
+PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 100))
+PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 1000))
+STREAM_FETCH_SIZE = int(os.getenv('STREAM_FETCH_SIZE', 1000))
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))
+BULK_MAX_ERRORS = int(os.getenv('BULK_MAX_ERRORS', 100))
+USER_FIELD_MAX_LENGTH = 100
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+Page = namedtuple('Page', ['after_id', 'limit', 'stream'])
+
+# Columns a ?fields= projection may select, per table.
+USER_COLUMNS = ('id', 'nome', 'email', 'data_criacao')
+LOG_COLUMNS = ('id', 'mensagem', 'data_log')
+
+
+db_query_duration = registry.histogram(
+    'db_query_duration_seconds',
+    'Time spent in cursor.execute(), by statement type.',
+    ('statement',)
+)
+
+
+class TimedQueries:
+    """Cursor mixin that records every execute() in db_query_duration."""
+
+    def execute(self, query, vars=None):
+        # Only look at the start: execute_values() sends whole batches as bytes.
+        head = query[:16].decode(errors='replace') if isinstance(query, bytes) else query[:16]
+        statement = head.split(None, 1)[0].lower() if isinstance(head, str) and head.strip() else 'other'
+        with db_query_duration.time(statement):
+            return super().execute(query, vars)
+
+
+class TimedCursor(TimedQueries, psycopg2.extensions.cursor):
+    pass
+
+
+class TimedRealDictCursor(TimedQueries, RealDictCursor):
+    pass
+
+
+def open_database_connection():
+    return psycopg2.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        port=DB_PORT,
+        cursor_factory=TimedCursor
+    )
+
+
+db_pool = ConnectionPool(
+    open_database_connection,
+    min_size=DB_POOL_MIN,
+    max_size=DB_POOL_MAX,
+    checkout_timeout=DB_POOL_TIMEOUT,
+    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL
+)
+
 
 def connect_database():
     try:
-        connection = psycopg2.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            port=DB_PORT
-        )
-        return connection
+        return db_pool.acquire()
     except Exception as error:
         print(f"Connection error: {error}")
         return None
 
 
-@app.route('/users', methods=['GET'])
-def list_users():
+def release_database(connection):
+    db_pool.release(connection)
+
+
+def read_page_args():
+    """Parse ?after_id=, ?limit= and ?stream= into a Page, raising ValueError on bad input."""
+    after_id = request.args.get('after_id')
+    limit = request.args.get('limit')
+    stream = request.args.get('stream')
+
+    if stream is not None and stream not in STREAM_FORMATS:
+        raise ValueError(f"stream must be one of {sorted(STREAM_FORMATS)}")
+
+    try:
+        after_id = int(after_id) if after_id is not None else None
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        raise ValueError("after_id and limit must be integers")
+
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be positive")
+    if limit is not None and not stream and limit > PAGE_SIZE_MAX:
+        raise ValueError(f"limit must not exceed {PAGE_SIZE_MAX}")
+    if limit is None and after_id is not None and not stream:
+        limit = PAGE_SIZE_DEFAULT
+
+    return Page(after_id, limit, stream)
+
+
+def stream_rows(connection, query, params, stream_format):
+    """
+    Yield rows from a server-side cursor as a JSON array or NDJSON, one batch
+    at a time. connection stays checked out; fetch_list() gives it back when
+    the response is closed.
+    """
+    try:
+        cursor = connection.cursor(name='stream_rows', cursor_factory=TimedRealDictCursor)
+        cursor.execute(query, params)
+
+        if stream_format == 'json':
+            yield "["
+        first_batch = True
+        while True:
+            rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            if stream_format == 'ndjson':
+                yield "".join(app.json.dumps(row) + "\n" for row in rows)
+            else:
+                chunk = ",".join(app.json.dumps(row) for row in rows)
+                yield chunk if first_batch else "," + chunk
+            first_batch = False
+        if stream_format == 'json':
+            yield "]"
+
+        cursor.close()
+    except Exception as error:
+        print(f"Stream error: {error}")
+        raise
+
+
+def fetch_list(table, order_by, keyset_condition, page, fields=None):
+    """
+    Run a list query in one of three modes: the full list (no paging args),
+    a keyset page (?after_id=/?limit=) or a streamed response (?stream=).
+    fields, from parse_fields(), replaces SELECT * with those columns.
+    """
+    query = f"SELECT {', '.join(fields) if fields else '*'} FROM {table}"
+    params = []
+    if page.after_id is not None:
+        query += f" WHERE {keyset_condition}"
+        params.append(page.after_id)
+    query += f" ORDER BY {order_by}"
+
+    if page.stream:
+        if page.limit is not None:
+            query += " LIMIT %s"
+            params.append(page.limit)
+    elif page.limit is not None:
+        query += " LIMIT %s"
+        params.append(page.limit + 1)
+
     connection = connect_database()
     if not connection:
         return jsonify({"error": "Database connection failed"}), 500
 
+    if page.stream:
+        response = Response(
+            stream_rows(connection, query, params, page.stream),
+            mimetype=STREAM_FORMATS[page.stream]
+        )
+        # Released on close rather than at the end of stream_rows(): a
+        # stream that is never iterated (HEAD, a client gone before the
+        # first chunk) never runs the generator's cleanup.
+        response.call_on_close(lambda: release_database(connection))
+        return response
+
     try:
-        cursor = connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("SELECT * FROM usuarios ORDER BY id;")
-        users = cursor.fetchall()
+        cursor = connection.cursor(cursor_factory=TimedRealDictCursor)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
         cursor.close()
-        connection.close()
-        return jsonify([dict(user) for user in users])
     except Exception as error:
-        connection.close()
         return jsonify({"error": str(error)}), 500
+    finally:
+        release_database(connection)
+
+    if page.limit is None:
+        return jsonify([dict(row) for row in rows])
+
+    has_more = len(rows) > page.limit
+    rows = rows[:page.limit]
+    return jsonify({
+        "data": [dict(row) for row in rows],
+        "limit": page.limit,
+        "next_after_id": rows[-1]['id'] if has_more else None
+    })
+
+
+@app.route('/users', methods=['GET'])
+def list_users():
+    try:
+        page = read_page_args()
+        fields = parse_fields(request.args.get('fields'), USER_COLUMNS)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    return fetch_list("usuarios", "id", "id > %s", page, fields)
 
 
 @app.route('/users', methods=['POST'])
@@ -68,7 +253,6 @@ def create_user():
         new_user = cursor.fetchone()
         connection.commit()
         cursor.close()
-        connection.close()
 
         return jsonify({
             "id": new_user[0],
@@ -77,26 +261,91 @@ def create_user():
             "data_criacao": new_user[3].isoformat()
         }), 201
     except Exception as error:
-        connection.close()
         return jsonify({"error": str(error)}), 500
+    finally:
+        release_database(connection)
 
 
-@app.route('/logs', methods=['GET'])
-def list_logs():
+def validate_user(row, seen_emails):
+    """Return (name, email) for a bulk row, raising ValueError with the reason it cannot be inserted."""
+    if not isinstance(row, dict):
+        raise ValueError("Row must be a JSON object")
+    name = row.get('nome')
+    email = row.get('email')
+
+    if not name or not email:
+        raise ValueError("Name and email are required")
+    if not isinstance(name, str) or not isinstance(email, str):
+        raise ValueError("Name and email must be strings")
+    if len(name) > USER_FIELD_MAX_LENGTH or len(email) > USER_FIELD_MAX_LENGTH:
+        raise ValueError(f"Name and email must not exceed {USER_FIELD_MAX_LENGTH} characters")
+    if '\x00' in name or '\x00' in email:
+        raise ValueError("Name and email must not contain NUL characters")
+    if email in seen_emails:
+        raise ValueError("Email repeated in this request")
+
+    seen_emails.add(email)
+    return name, email
+
+
+@app.route('/users/bulk', methods=['POST'])
+def create_users_bulk():
+    """
+    Insert a JSON array or an NDJSON stream of users in one transaction,
+    BULK_BATCH_SIZE rows per INSERT. Invalid rows and emails that are already
+    registered are skipped and reported by index.
+    """
     connection = connect_database()
     if not connection:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
-        cursor = connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("SELECT * FROM logs ORDER BY data_log DESC;")
-        logs = cursor.fetchall()
+        cursor = connection.cursor()
+
+        def insert_batch(batch):
+            inserted = execute_values(
+                cursor,
+                "INSERT INTO usuarios (nome, email) VALUES %s ON CONFLICT (email) DO NOTHING RETURNING email;",
+                [values for _, values in batch],
+                page_size=len(batch),
+                fetch=True
+            )
+            inserted_emails = {row[0] for row in inserted}
+            return [(index, "Email already registered") for index, (_, email) in batch if email not in inserted_emails]
+
+        seen_emails = set()
+        bulk = BulkInsert(insert_batch, batch_size=BULK_BATCH_SIZE, max_errors=BULK_MAX_ERRORS)
+        bulk.load(read_rows(request, json_codec.loads), lambda row: validate_user(row, seen_emails))
+        if not bulk.inserted and not bulk.failed:
+            return jsonify({"error": "No rows to insert"}), 400
+
+        connection.commit()
         cursor.close()
-        connection.close()
-        return jsonify([dict(log) for log in logs])
+
+        return jsonify(bulk.report()), 201 if bulk.inserted else 400
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
     except Exception as error:
-        connection.close()
         return jsonify({"error": str(error)}), 500
+    finally:
+        release_database(connection)
+
+
+@app.route('/logs', methods=['GET'])
+def list_logs():
+    try:
+        page = read_page_args()
+        fields = parse_fields(request.args.get('fields'), LOG_COLUMNS)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    return fetch_list(
+        "logs",
+        "data_log DESC, id DESC",
+        "(data_log, id) < (SELECT data_log, id FROM logs WHERE id = %s)",
+        page,
+        fields
+    )
 
 
 @app.route('/status', methods=['GET'])
@@ -108,29 +357,40 @@ def status():
             cursor.execute("SELECT COUNT(*) FROM usuarios;")
             total_users = cursor.fetchone()[0]
             cursor.close()
-            connection.close()
-
-            return jsonify({
-                "status": "ok",
-                "database": "connected",
-                "total_users": total_users,
-                "timestamp": datetime.now().isoformat()
-            })
         except Exception as error:
-            connection.close()
+            release_database(connection)
             return jsonify({
                 "status": "error",
                 "database": "query_error",
                 "error": str(error),
+                "pool": db_pool.metrics(),
                 "timestamp": datetime.now().isoformat()
             }), 500
+        release_database(connection)
+
+        return jsonify({
+            "status": "ok",
+            "database": "connected",
+            "total_users": total_users,
+            "pool": db_pool.metrics(),
+            "timestamp": datetime.now().isoformat()
+        })
     else:
         return jsonify({
             "status": "error",
             "database": "disconnected",
+            "pool": db_pool.metrics(),
             "timestamp": datetime.now().isoformat()
         }), 500
 
 
+def start_worker():
+    try:
+        db_pool.fill()
+    except Exception as error:
+        print(f"Connection error: {error}")
+
+
 if __name__ == '__main__':
+    start_worker()
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
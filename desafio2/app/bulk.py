@@ -0,0 +1,96 @@
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def read_rows(request, loads):
+    """
+    Yield (index, row, error) for each row of a bulk request body.
+
+    An application/x-ndjson body is read line by line from the request
+    stream, so a bad line only fails that row and the body is never held in
+    memory as a whole; blank lines are skipped and do not take an index.
+    Any other body must be a JSON array. Raises ValueError if the body as a
+    whole is unusable.
+    """
+    if request.mimetype == NDJSON_MIMETYPE:
+        index = 0
+        for line in request.stream:
+            if not line.strip():
+                continue
+            try:
+                yield index, loads(line), None
+            except ValueError as error:
+                yield index, None, f"Invalid JSON: {error}"
+            index += 1
+        return
+
+    try:
+        rows = loads(request.get_data())
+    except ValueError as error:
+        raise ValueError(f"Invalid JSON: {error}")
+    if not isinstance(rows, list):
+        raise ValueError(f"Body must be a JSON array or {NDJSON_MIMETYPE}")
+    for index, row in enumerate(rows):
+        yield index, row, None
+
+
+class BulkInsert:
+    """
+    Validates rows one at a time and inserts the valid ones in batches of
+    batch_size with insert_batch(batch), inside the caller's transaction.
+
+    batch is a list of (index, values); insert_batch returns the
+    (index, error) pairs the database refused (e.g. ON CONFLICT DO NOTHING),
+    so every row ends up either inserted or reported. At most max_errors
+    errors are kept; failed always has the full count.
+    """
+
+    def __init__(self, insert_batch, batch_size=1000, max_errors=100):
+        self._insert_batch = insert_batch
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+        self._pending = []
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def load(self, rows, validate):
+        """Feed (index, row, error) from read_rows() through validate(row) -> values and insert them."""
+        for index, row, error in rows:
+            if error is None:
+                try:
+                    values = validate(row)
+                except ValueError as validation_error:
+                    error = str(validation_error)
+            if error is None:
+                self.add(index, values)
+            else:
+                self.fail(index, error)
+        self.flush()
+
+    def add(self, index, values):
+        self._pending.append((index, values))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def fail(self, index, error):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"index": index, "error": error})
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        rejected = self._insert_batch(batch) or []
+        for index, error in rejected:
+            self.fail(index, error)
+        self.inserted += len(batch) - len(rejected)
+
+    def report(self):
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
@@ -0,0 +1,53 @@
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+
+# Gunicorn settings used when the container runs with SERVER_MODE=production.
+# Every value can be overridden through the environment.
+
+IN_MEMORY_STATE = os.getenv('IN_MEMORY_STATE', 'false').lower() == 'true'
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.getenv('WEB_THREADS', 4))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+timeout = int(os.getenv('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 0))
+preload_app = os.getenv('WEB_PRELOAD', 'false').lower() == 'true'
+accesslog = '-'
+
+if IN_MEMORY_STATE:
+    # The service keeps its data in process memory, so a second worker (or a
+    # worker recycled by max_requests) would serve a different copy of it.
+    # Such services run one worker and scale with threads.
+    if workers != 1 or max_requests:
+        print("IN_MEMORY_STATE=true: running a single worker without max_requests")
+    workers = 1
+    max_requests = 0
+
+if workers > 1 or max_requests:
+    # Each worker process counts its own metrics; they are written to
+    # METRICS_DIR so /metrics can sum them (see metrics.py) and a scrape
+    # does not depend on which worker answers it.
+    os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'gunicorn-metrics'))
+
+
+def on_starting(server):
+    """Start the metrics of this run from zero: remove the files an earlier run left in METRICS_DIR."""
+    directory = os.environ.get('METRICS_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            os.remove(path)
+
+
+def post_worker_init(worker):
+    """Run the app module's start_worker(), if it has one, inside each worker after the fork."""
+    start_worker = getattr(sys.modules.get('app'), 'start_worker', None)
+    if start_worker is not None:
+        start_worker()
@@ -1,12 +1,24 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 import redis
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from datetime import datetime
+from collections import namedtuple
 import os
-import json
+
+from bulk import BulkInsert, read_rows
+from compression import use_compression
+from counters import BatchedCounters, CountersUnavailable
+from db_pool import ConnectionPool
+from metrics import instrument, registry
+from post_cache import PostCache
+from projection import parse_fields, project
+from serialization import use_json_codec
 
 app = Flask(__name__)
+instrument(app)
+json_codec = use_json_codec(app, os.getenv('JSON_BACKEND', 'auto'))
+compressor = use_compression(app, int(os.getenv('COMPRESSION_MIN_SIZE', 1024)), int(os.getenv('COMPRESSION_LEVEL', 6)))
 
 DB_HOST = os.getenv('DB_HOST', 'db')
 DB_USER = os.getenv('DB_USER', 'usuario')
@@ -16,31 +28,349 @@ DB_PORT = os.getenv('DB_PORT', '5432')
 
 REDIS_HOST = os.getenv('REDIS_HOST', 'cache')
 REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 5))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 2))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', 2))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30))
+
+POSTS_CACHE_TTL = int(os.getenv('POSTS_CACHE_TTL', 60))
+POSTS_CACHE_LOCK_TTL = float(os.getenv('POSTS_CACHE_LOCK_TTL', 5))
+POSTS_CACHE_LOCK_WAIT = float(os.getenv('POSTS_CACHE_LOCK_WAIT', 2))
+POSTS_CACHE_GZIP = os.getenv('POSTS_CACHE_GZIP', 'true').lower() == 'true'
+
+COUNTER_FLUSH_INTERVAL = float(os.getenv('COUNTER_FLUSH_INTERVAL', 1))
+COUNTER_MINUTE_RETENTION = int(os.getenv('COUNTER_MINUTE_RETENTION', 120))
+COUNTER_HOUR_RETENTION = int(os.getenv('COUNTER_HOUR_RETENTION', 48))
+
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))
+
+PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 100))
+PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 1000))
+STREAM_FETCH_SIZE = int(os.getenv('STREAM_FETCH_SIZE', 1000))
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))
+BULK_MAX_ERRORS = int(os.getenv('BULK_MAX_ERRORS', 100))
+POST_TITLE_MAX_LENGTH = 200
+POST_AUTHOR_MAX_LENGTH = 100
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+Page = namedtuple('Page', ['after_id', 'limit', 'stream'])
+
+# Columns a ?fields= projection may select.
+POST_COLUMNS = ('id', 'title', 'content', 'author', 'created_at')
+
+
+db_query_duration = registry.histogram(
+    'db_query_duration_seconds',
+    'Time spent in cursor.execute(), by statement type.',
+    ('statement',)
+)
+
+
+class TimedQueries:
+    """Cursor mixin that records every execute() in db_query_duration."""
+
+    def execute(self, query, vars=None):
+        # Only look at the start: execute_values() sends whole batches as bytes.
+        head = query[:16].decode(errors='replace') if isinstance(query, bytes) else query[:16]
+        statement = head.split(None, 1)[0].lower() if isinstance(head, str) and head.strip() else 'other'
+        with db_query_duration.time(statement):
+            return super().execute(query, vars)
+
+
+class TimedCursor(TimedQueries, psycopg2.extensions.cursor):
+    pass
+
+
+class TimedRealDictCursor(TimedQueries, RealDictCursor):
+    pass
+
+
+def open_database_connection():
+    return psycopg2.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        port=DB_PORT,
+        cursor_factory=TimedCursor
+    )
+
+
+db_pool = ConnectionPool(
+    open_database_connection,
+    min_size=DB_POOL_MIN,
+    max_size=DB_POOL_MAX,
+    checkout_timeout=DB_POOL_TIMEOUT,
+    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL
+)
 
 
 def connect_database():
     try:
-        connection = psycopg2.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            port=DB_PORT
-        )
-        return connection
+        return db_pool.acquire()
     except Exception as error:
         print(f"Error connecting to DB: {error}")
         return None
 
 
-def connect_redis():
+def release_database(connection):
+    db_pool.release(connection)
+
+
+def read_page_args():
+    """Parse ?after_id=, ?limit= and ?stream= into a Page, raising ValueError on bad input."""
+    after_id = request.args.get('after_id')
+    limit = request.args.get('limit')
+    stream = request.args.get('stream')
+
+    if stream is not None and stream not in STREAM_FORMATS:
+        raise ValueError(f"stream must be one of {sorted(STREAM_FORMATS)}")
+
     try:
-        redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
-        redis_client.ping()
-        return redis_client
+        after_id = int(after_id) if after_id is not None else None
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        raise ValueError("after_id and limit must be integers")
+
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be positive")
+    if limit is not None and not stream and limit > PAGE_SIZE_MAX:
+        raise ValueError(f"limit must not exceed {PAGE_SIZE_MAX}")
+    if limit is None and after_id is not None and not stream:
+        limit = PAGE_SIZE_DEFAULT
+
+    return Page(after_id, limit, stream)
+
+
+def stream_rows(connection, query, params, stream_format):
+    """
+    Yield rows from a server-side cursor as a JSON array or NDJSON, one batch
+    at a time. connection stays checked out; fetch_list() gives it back when
+    the response is closed.
+    """
+    try:
+        cursor = connection.cursor(name='stream_rows', cursor_factory=TimedRealDictCursor)
+        cursor.execute(query, params)
+
+        if stream_format == 'json':
+            yield "["
+        first_batch = True
+        while True:
+            rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            if stream_format == 'ndjson':
+                yield "".join(app.json.dumps(row) + "\n" for row in rows)
+            else:
+                chunk = ",".join(app.json.dumps(row) for row in rows)
+                yield chunk if first_batch else "," + chunk
+            first_batch = False
+        if stream_format == 'json':
+            yield "]"
+
+        cursor.close()
     except Exception as error:
-        print(f"Error connecting to Redis: {error}")
-        return None
+        print(f"Error streaming rows: {error}")
+        raise
+
+
+def build_list_query(table, order_by, keyset_condition, page, fields=None):
+    query = f"SELECT {', '.join(fields) if fields else '*'} FROM {table}"
+    params = []
+    if page.after_id is not None:
+        query += f" WHERE {keyset_condition}"
+        params.append(page.after_id)
+    query += f" ORDER BY {order_by}"
+
+    if page.stream:
+        if page.limit is not None:
+            query += " LIMIT %s"
+            params.append(page.limit)
+    elif page.limit is not None:
+        query += " LIMIT %s"
+        params.append(page.limit + 1)
+
+    return query, params
+
+
+def fetch_list(table, order_by, keyset_condition, page, fields=None):
+    """
+    Run a list query in one of three modes: the full list (no paging args),
+    a keyset page (?after_id=/?limit=) or a streamed response (?stream=).
+    fields, from parse_fields(), replaces SELECT * with those columns.
+    """
+    query, params = build_list_query(table, order_by, keyset_condition, page, fields)
+
+    connection = connect_database()
+    if not connection:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    if page.stream:
+        response = Response(
+            stream_rows(connection, query, params, page.stream),
+            mimetype=STREAM_FORMATS[page.stream]
+        )
+        # Released on close rather than at the end of stream_rows(): a
+        # stream that is never iterated (HEAD, a client gone before the
+        # first chunk) never runs the generator's cleanup.
+        response.call_on_close(lambda: release_database(connection))
+        return response
+
+    try:
+        cursor = connection.cursor(cursor_factory=TimedRealDictCursor)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    except Exception as error:
+        return jsonify({"error": str(error)}), 500
+    finally:
+        release_database(connection)
+
+    if page.limit is None:
+        return jsonify([dict(row) for row in rows])
+
+    has_more = len(rows) > page.limit
+    rows = rows[:page.limit]
+    return jsonify({
+        "data": [dict(row) for row in rows],
+        "limit": page.limit,
+        "next_after_id": rows[-1]['id'] if has_more else None
+    })
+
+
+redis_pool = redis.BlockingConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=REDIS_POOL_TIMEOUT,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+    health_check_interval=REDIS_HEALTH_CHECK_INTERVAL
+)
+
+redis_command_duration = registry.histogram(
+    'redis_command_duration_seconds',
+    'Round-trip time of Redis commands and pipelines, by command.',
+    ('command',)
+)
+
+
+class TimedRedis(redis.Redis):
+    """Redis client that records each command, and each pipeline as a whole, in redis_command_duration."""
+
+    def execute_command(self, *args, **options):
+        with redis_command_duration.time(str(args[0]).lower()):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        def timed_execute(*args, **kwargs):
+            with redis_command_duration.time('pipeline'):
+                return execute(*args, **kwargs)
+
+        pipe.execute = timed_execute
+        return pipe
+
+
+# Connections are opened lazily by the pool and re-checked with PING only
+# after sitting idle for REDIS_HEALTH_CHECK_INTERVAL seconds, so callers
+# handle Redis errors on the command itself instead of pinging first.
+redis_client = TimedRedis(connection_pool=redis_pool)
+
+
+post_cache = PostCache(
+    redis_client,
+    ttl=POSTS_CACHE_TTL,
+    lock_ttl=POSTS_CACHE_LOCK_TTL,
+    lock_wait=POSTS_CACHE_LOCK_WAIT,
+    codec=json_codec,
+    compress_page=(lambda posts_json: compressor.gzip_prefix(data_prefix(posts_json))) if POSTS_CACHE_GZIP else None
+)
+
+counters = BatchedCounters(
+    redis_client,
+    flush_interval=COUNTER_FLUSH_INTERVAL,
+    minute_retention=COUNTER_MINUTE_RETENTION,
+    hour_retention=COUNTER_HOUR_RETENTION
+)
+
+
+def count_posts_created(amount=1):
+    """Count committed posts; best-effort, so a Redis outage never fails a write that already happened."""
+    try:
+        counters.incr('posts_created', amount)
+    except CountersUnavailable as error:
+        print(f"Error counting created posts: {error}")
+
+
+def serialize_post(row):
+    post = dict(row)
+    post['created_at'] = post['created_at'].isoformat()
+    return post
+
+
+def data_prefix(items_json):
+    return b'{"data":[' + b','.join(items_json) + b']'
+
+
+def data_suffix(fields):
+    rest = json_codec.dump_bytes(fields, default=app.json.default, sort_keys=True)
+    return (b',' + rest[1:] if fields else b'}') + b'\n'
+
+
+def json_with_data(items_json, fields):
+    """
+    Build the same body jsonify({"data": [...], **fields}) would, with "data"
+    spliced in from items that are already JSON encoded (e.g. straight from
+    Redis) instead of decoding and re-encoding them. Relies on "data" sorting
+    before every key of fields.
+    """
+    return app.response_class(data_prefix(items_json) + data_suffix(fields), mimetype='application/json')
+
+
+def gzip_json_with_data(compressed_prefix, fields):
+    """json_with_data() gzip-encoded, from the page's data_prefix() already compressed by compressor.gzip_prefix()."""
+    response = app.response_class(
+        compressor.gzip_with_prefix(compressed_prefix, data_suffix(fields)),
+        mimetype='application/json'
+    )
+    response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def load_posts_page(page):
+    """Read one page of posts from the database as (posts, next_after_id)."""
+    query, params = build_list_query("posts", "id DESC", "id < %s", page)
+
+    connection = connect_database()
+    if not connection:
+        raise RuntimeError("Database connection failed")
+
+    try:
+        cursor = connection.cursor(cursor_factory=TimedRealDictCursor)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        release_database(connection)
+
+    if page.limit is None:
+        return [serialize_post(row) for row in rows], None
+
+    has_more = len(rows) > page.limit
+    rows = rows[:page.limit]
+    return [serialize_post(row) for row in rows], rows[-1]['id'] if has_more else None
 
 
 @app.route('/health', methods=['GET'])
@@ -51,41 +381,35 @@ def health():
 @app.route('/status', methods=['GET'])
 def status():
     db_connection = connect_database()
-    redis_connection = connect_redis()
-
     db_status = "connected" if db_connection else "disconnected"
-    redis_status = "connected" if redis_connection else "disconnected"
-
-    # Close connections if opened
     if db_connection:
-        db_connection.close()
-    if redis_connection:
-        redis_connection.close()
+        release_database(db_connection)
+
+    try:
+        redis_client.ping()
+        redis_status = "connected"
+    except Exception as error:
+        print(f"Error connecting to Redis: {error}")
+        redis_status = "disconnected"
 
     return jsonify({
         "status": "ok",
         "database": db_status,
         "cache": redis_status,
+        "pool": db_pool.metrics(),
         "timestamp": datetime.now().isoformat()
     }), 200
 
 
 @app.route('/api/posts', methods=['GET'])
 def list_posts():
-    connection = connect_database()
-    if not connection:
-        return jsonify({"error": "Database connection failed"}), 500
-
     try:
-        cursor = connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("SELECT * FROM posts ORDER BY id DESC;")
-        posts = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        return jsonify([dict(post) for post in posts])
-    except Exception as error:
-        connection.close()
-        return jsonify({"error": str(error)}), 500
+        page = read_page_args()
+        fields = parse_fields(request.args.get('fields'), POST_COLUMNS)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    return fetch_list("posts", "id DESC", "id < %s", page, fields)
 
 
 @app.route('/api/posts', methods=['POST'])
@@ -111,11 +435,15 @@ def create_post():
         new_post = cursor.fetchone()
         connection.commit()
         cursor.close()
-        connection.close()
 
-        redis_client = connect_redis()
-        if redis_client:
-            redis_client.delete('posts_cache')
+        post_cache.add_post({
+            "id": new_post[0],
+            "title": new_post[1],
+            "content": new_post[2],
+            "author": new_post[3],
+            "created_at": new_post[4].isoformat()
+        })
+        count_posts_created()
 
         return jsonify({
             "id": new_post[0],
@@ -125,62 +453,132 @@ def create_post():
             "data_criacao": new_post[4].isoformat()
         }), 201
     except Exception as error:
-        connection.close()
         return jsonify({"error": str(error)}), 500
-
-
-@app.route('/api/posts/cache', methods=['GET'])
-def list_posts_cache():
-    redis_client = connect_redis()
-
-    if redis_client:
-        cached_data = redis_client.get('posts_cache')
-        if cached_data:
-            return jsonify({
-                "source": "cache",
-                "data": json.loads(cached_data),
-                "timestamp": datetime.now().isoformat()
-            }), 200
-
+    finally:
+        release_database(connection)
+
+
+def validate_post(row):
+    """Return (title, content, author) for a bulk row, raising ValueError with the reason it cannot be inserted."""
+    if not isinstance(row, dict):
+        raise ValueError("Row must be a JSON object")
+    title = row.get('titulo')
+    content = row.get('conteudo')
+    author = row.get('autor', 'Anônimo')
+
+    if not title or not content:
+        raise ValueError("Title and content are required")
+    if not all(isinstance(value, str) for value in (title, content, author)):
+        raise ValueError("Title, content and author must be strings")
+    if len(title) > POST_TITLE_MAX_LENGTH:
+        raise ValueError(f"Title must not exceed {POST_TITLE_MAX_LENGTH} characters")
+    if len(author) > POST_AUTHOR_MAX_LENGTH:
+        raise ValueError(f"Author must not exceed {POST_AUTHOR_MAX_LENGTH} characters")
+    if any('\x00' in value for value in (title, content, author)):
+        raise ValueError("Title, content and author must not contain NUL characters")
+
+    return title, content, author
+
+
+@app.route('/api/posts/bulk', methods=['POST'])
+def create_posts_bulk():
+    """
+    Insert a JSON array or an NDJSON stream of posts in one transaction,
+    BULK_BATCH_SIZE rows per INSERT, and invalidate the cached head pages
+    once at the end. Invalid rows are skipped and reported by index.
+    """
     connection = connect_database()
     if not connection:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
-        cursor = connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("SELECT * FROM posts ORDER BY id DESC;")
-        posts = cursor.fetchall()
+        cursor = connection.cursor()
+
+        def insert_batch(batch):
+            execute_values(
+                cursor,
+                "INSERT INTO posts (title, content, author) VALUES %s;",
+                [values for _, values in batch],
+                page_size=len(batch)
+            )
+
+        bulk = BulkInsert(insert_batch, batch_size=BULK_BATCH_SIZE, max_errors=BULK_MAX_ERRORS)
+        bulk.load(read_rows(request, json_codec.loads), validate_post)
+        if not bulk.inserted and not bulk.failed:
+            return jsonify({"error": "No rows to insert"}), 400
+
+        connection.commit()
         cursor.close()
-        connection.close()
 
-        posts_list = [dict(post) for post in posts]
+        if bulk.inserted:
+            post_cache.invalidate_head()
+            count_posts_created(bulk.inserted)
 
-        if redis_client:
-            redis_client.setex('posts_cache', 60, json.dumps(posts_list, default=str))
+        return jsonify(bulk.report()), 201 if bulk.inserted else 400
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    except Exception as error:
+        return jsonify({"error": str(error)}), 500
+    finally:
+        release_database(connection)
 
-        return jsonify({
-            "source": "database",
-            "data": posts_list,
-            "timestamp": datetime.now().isoformat()
-        }), 200
+
+@app.route('/api/posts/cache', methods=['GET'])
+def list_posts_cache():
+    try:
+        page = read_page_args()
+        fields = parse_fields(request.args.get('fields'), POST_COLUMNS)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    if page.stream:
+        return jsonify({"error": "stream is not supported on the cached endpoint"}), 400
+
+    # Prefer gzip here: it is the encoding pages are stored compressed in.
+    use_gzip = POSTS_CACHE_GZIP and not fields and compressor.negotiate(request.accept_encodings, preferred='gzip') == 'gzip'
+    try:
+        cached_page = post_cache.get_page(
+            page.after_id,
+            page.limit,
+            lambda: load_posts_page(page),
+            compressed=use_gzip
+        )
     except Exception as error:
-        connection.close()
         return jsonify({"error": str(error)}), 500
 
+    response = {
+        "source": cached_page.source,
+        "timestamp": datetime.now().isoformat()
+    }
+    if page.limit is not None:
+        response["limit"] = page.limit
+        response["next_after_id"] = cached_page.next_after_id
+
+    if cached_page.compressed is not None:
+        return gzip_json_with_data(cached_page.compressed, response), 200
+
+    posts_json = cached_page.posts_json
+    if fields:
+        # Pages are cached whole; a projection re-encodes only what it keeps.
+        posts_json = [
+            json_codec.dump_bytes(project(json_codec.loads(post), fields), sort_keys=True)
+            for post in posts_json
+        ]
+    return json_with_data(posts_json, response), 200
+
 
 @app.route('/api/counter', methods=['GET'])
 def counter():
-    redis_client = connect_redis()
-    if not redis_client:
-        return jsonify({"error": "Cache not available"}), 500
-
     try:
-        current_counter = redis_client.incr('request_counter')
+        current_counter = counters.incr('request_counter')
         return jsonify({
             "counter": current_counter,
             "message": f"Request number {current_counter}",
             "timestamp": datetime.now().isoformat()
         }), 200
+    except CountersUnavailable as error:
+        print(f"Error connecting to Redis: {error}")
+        return jsonify({"error": "Cache not available"}), 500
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 
@@ -188,7 +586,6 @@ def counter():
 @app.route('/api/stats', methods=['GET'])
 def stats():
     connection = connect_database()
-    redis_client = connect_redis()
 
     total_posts = 0
     if connection:
@@ -197,23 +594,50 @@ def stats():
             cursor.execute("SELECT COUNT(*) FROM posts;")
             total_posts = cursor.fetchone()[0]
             cursor.close()
-            connection.close()
         except Exception:
             pass
+        finally:
+            release_database(connection)
 
-    total_requests = 0
-    if redis_client:
-        try:
-            total_requests = int(redis_client.get('request_counter') or 0)
-        except Exception:
-            pass
+    totals = {"request_counter": 0, "posts_created": 0}
+    request_rates = None
+    redis_info = None
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        read_totals = counters.queue_totals(pipe, 'request_counter', 'posts_created')
+        read_rates = counters.queue_rates(pipe, 'request_counter')
+        pipe.info('stats')
+        # One round trip; a command that fails (e.g. INFO where it is not
+        # supported) only leaves its own part of the response empty.
+        stored_totals, stored_rates, stored_info = pipe.execute(raise_on_error=False)
+        if not isinstance(stored_totals, Exception):
+            totals = read_totals(stored_totals)
+        if not isinstance(stored_rates, Exception):
+            request_rates = read_rates(stored_rates)
+        if not isinstance(stored_info, Exception):
+            redis_info = stored_info
+    except Exception:
+        pass
 
     return jsonify({
         "total_posts": total_posts,
-        "total_requests": total_requests,
+        "total_requests": totals['request_counter'],
+        "posts_created": totals['posts_created'],
+        "request_rates": request_rates,
+        "counters": counters.stats(),
+        "cache": post_cache.stats(redis_info),
         "timestamp": datetime.now().isoformat()
     }), 200
 
 
+def start_worker():
+    counters.start()
+    try:
+        db_pool.fill()
+    except Exception as error:
+        print(f"Error connecting to DB: {error}")
+
+
 if __name__ == '__main__':
+    start_worker()
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
@@ -0,0 +1,165 @@
+import gzip
+import struct
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content-Encodings in order of preference when the client accepts several
+# with the same quality; br and zstd only once their packages are installed.
+ENCODINGS = ('br', 'zstd', 'gzip')
+MAX_LEVELS = {'br': 11, 'zstd': 22, 'gzip': 9}
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/plain', 'text/html')
+
+# gzip member header: deflate, no flags, no mtime, unknown OS.
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def encoded_etag(etag, encoding):
+    """ETag of the encoding-compressed representation of the body tagged etag."""
+    return f"{etag}-{encoding}"
+
+
+def matching_etag(if_none_match, etag):
+    """The tag among etag and its compressed variants that if_none_match names, or None."""
+    for tag in (etag,) + tuple(encoded_etag(etag, encoding) for encoding in ENCODINGS):
+        if if_none_match.contains_weak(tag):
+            return tag
+    return None
+
+
+class Compressor:
+    """
+    Compresses response bodies with the best Content-Encoding the client
+    accepts. gzip is always available; br and zstd are offered when the
+    brotli and zstandard packages are installed.
+
+    level is used for every encoding, capped at each one's maximum. Bodies
+    smaller than min_size are sent as they are: below about a kilobyte the
+    headers cost more than compression saves.
+    """
+
+    def __init__(self, min_size=1024, level=6):
+        self.min_size = min_size
+        self.level = level
+        self.encodings = tuple(
+            encoding for encoding in ENCODINGS
+            if encoding == 'gzip'
+            or (encoding == 'br' and brotli is not None)
+            or (encoding == 'zstd' and zstandard is not None)
+        )
+
+    def negotiate(self, accept_encodings, preferred=None):
+        """The encoding to use for a request's Accept-Encoding, or None for identity."""
+        encodings = self.encodings
+        if preferred in encodings:
+            encodings = (preferred,) + tuple(encoding for encoding in encodings if encoding != preferred)
+        return accept_encodings.best_match(encodings)
+
+    def compress(self, data, encoding):
+        level = self._level(encoding)
+        if encoding == 'gzip':
+            return gzip.compress(data, compresslevel=level, mtime=0)
+        if encoding == 'br':
+            return brotli.compress(data, quality=level)
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    def stream(self, chunks, encoding):
+        """
+        Compress an iterable of str or bytes chunks, flushing after each one
+        so a streamed response still reaches the client as it is produced.
+        """
+        level = self._level(encoding)
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compress_chunk = lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            finish = compressor.flush
+        elif encoding == 'br':
+            compressor = brotli.Compressor(quality=level)
+            compress_chunk = lambda chunk: compressor.process(chunk) + compressor.flush()
+            finish = compressor.finish
+        else:
+            compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            compress_chunk = lambda chunk: compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            finish = compressor.flush
+
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield compress_chunk(chunk)
+        yield finish()
+
+    def gzip_prefix(self, data):
+        """
+        Compress data once as the start of gzip bodies that gzip_with_prefix()
+        completes later: the CRC-32 and length of data, then raw deflate
+        ending in a sync flush so more blocks can follow it.
+        """
+        deflate = zlib.compressobj(self._level('gzip'), zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = deflate.compress(data) + deflate.flush(zlib.Z_SYNC_FLUSH)
+        return struct.pack('>II', zlib.crc32(data), len(data) & 0xffffffff) + compressed
+
+    def gzip_with_prefix(self, prefix, tail):
+        """A complete gzip body of the data given to gzip_prefix() followed by tail; only tail is compressed here."""
+        crc, size = struct.unpack_from('>II', prefix)
+        deflate = zlib.compressobj(self._level('gzip'), zlib.DEFLATED, -zlib.MAX_WBITS)
+        return b''.join((
+            GZIP_HEADER,
+            prefix[8:],
+            deflate.compress(tail),
+            deflate.flush(),
+            struct.pack('<II', zlib.crc32(tail, crc), (size + len(tail)) & 0xffffffff)
+        ))
+
+    def _level(self, encoding):
+        return min(max(self.level, 1), MAX_LEVELS[encoding])
+
+
+def use_compression(app, min_size=1024, level=6):
+    """
+    Compress app's text and JSON responses per Accept-Encoding and return the
+    Compressor. Streamed responses are compressed chunk by chunk. A strong
+    ETag gets the encoding appended, since the compressed bytes differ; see
+    matching_etag(). Responses that already have a Content-Encoding (e.g.
+    stored compressed) are left alone.
+    """
+    compressor = Compressor(min_size, level)
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return response
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+            return response
+        if not response.is_streamed and len(response.get_data()) < compressor.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = compressor.negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compressor.stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(compressor.compress(response.get_data(), encoding))
+        response.content_encoding = encoding
+
+        etag, weak = response.get_etag()
+        if etag is not None:
+            response.set_etag(encoded_etag(etag, encoding), weak)
+        return response
+
+    return compressor
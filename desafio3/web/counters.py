@@ -0,0 +1,191 @@
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+
+MINUTE_FORMAT = '%Y%m%d%H%M'
+HOUR_FORMAT = '%Y%m%d%H'
+
+
+class CountersUnavailable(Exception):
+    pass
+
+
+class BatchedCounters:
+    """
+    Named counters kept in Redis, with increments batched in process memory.
+
+    incr() only adds to a local dict; a background thread sends everything
+    pending every flush_interval seconds in one pipeline (INCRBY on the total
+    and on per-minute and per-hour bucket keys, which expire after their
+    retention). Increments are bucketed by the time they happened, not by
+    when they were flushed. If a flush fails the deltas are put back and
+    retried on the next one, so while Redis is reachable every increment is
+    visible to other processes within flush_interval.
+
+    Readers see the last total this process got from Redis plus its own
+    pending increments; a name's total is read from Redis the first time it
+    is incremented. incr() raises CountersUnavailable, without counting,
+    while that read or the last flush fails.
+    """
+
+    def __init__(self, client, flush_interval=1.0, minute_retention=120, hour_retention=48):
+        self._client = client
+        self.flush_interval = flush_interval
+        self.minute_retention = minute_retention
+        self.hour_retention = hour_retention
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._in_flight = {}
+        self._known_totals = {}
+        self._thread = None
+        self._flushes = 0
+        self._flush_errors = 0
+        self._last_flush_failed = False
+        atexit.register(self.flush)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='counter-flush', daemon=True)
+            self._thread.start()
+
+    def incr(self, name, amount=1):
+        """Count amount for name now; returns this process's estimate of the new total."""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        if name not in self._known_totals:
+            self._load_totals([name])
+        minute = datetime.now().strftime(MINUTE_FORMAT)
+        with self._lock:
+            if self._last_flush_failed:
+                raise CountersUnavailable("Last flush to Redis failed")
+            counts = self._pending.setdefault(name, {})
+            counts[minute] = counts.get(minute, 0) + amount
+            return self._known_totals.get(name, 0) + self._pending_total(name)
+
+    def queue_totals(self, pipe, *names):
+        """
+        Queue the MGET for names' totals on pipe, so the caller can send it
+        with its own commands. Returns a function that takes that MGET's
+        result and gives the totals plus this process's unflushed increments.
+        """
+        pipe.mget(names)
+
+        def read(stored):
+            with self._lock:
+                result = {}
+                for name, value in zip(names, stored):
+                    self._known_totals[name] = int(value or 0)
+                    result[name] = self._known_totals[name] + self._pending_total(name)
+                return result
+
+        return read
+
+    def queue_rates(self, pipe, name, minutes=15, hours=24):
+        """
+        Queue the MGET for name's last minutes minute buckets and hours hour
+        buckets on pipe, like queue_totals(). The returned function gives the
+        counts newest first.
+        """
+        now = datetime.now()
+        minute_keys = [(now - timedelta(minutes=offset)).strftime(MINUTE_FORMAT) for offset in range(minutes)]
+        hour_keys = [(now - timedelta(hours=offset)).strftime(HOUR_FORMAT) for offset in range(hours)]
+        pipe.mget([f"{name}:m:{minute}" for minute in minute_keys] + [f"{name}:h:{hour}" for hour in hour_keys])
+
+        def read(values):
+            with self._lock:
+                pending = dict(self._pending.get(name, {}))
+
+            per_minute = []
+            for minute, value in zip(minute_keys, values[:minutes]):
+                per_minute.append({
+                    "minute": datetime.strptime(minute, MINUTE_FORMAT).isoformat(timespec='minutes'),
+                    "count": int(value or 0) + pending.get(minute, 0)
+                })
+
+            per_hour = []
+            for hour, value in zip(hour_keys, values[minutes:]):
+                local = sum(count for minute, count in pending.items() if minute.startswith(hour))
+                per_hour.append({
+                    "hour": datetime.strptime(hour, HOUR_FORMAT).isoformat(timespec='hours'),
+                    "count": int(value or 0) + local
+                })
+            return {"per_minute": per_minute, "per_hour": per_hour}
+
+        return read
+
+    def flush(self):
+        """Send every pending increment to Redis in one pipeline."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._in_flight = {name: sum(counts.values()) for name, counts in pending.items()}
+        if not pending:
+            return
+
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            names = []
+            for name, counts in pending.items():
+                names.append(name)
+                pipe.incrby(name, sum(counts.values()))
+            for name, counts in pending.items():
+                hours = {}
+                for minute, amount in counts.items():
+                    pipe.incrby(f"{name}:m:{minute}", amount)
+                    pipe.expire(f"{name}:m:{minute}", self.minute_retention * 60)
+                    hours[minute[:10]] = hours.get(minute[:10], 0) + amount
+                for hour, amount in hours.items():
+                    pipe.incrby(f"{name}:h:{hour}", amount)
+                    pipe.expire(f"{name}:h:{hour}", self.hour_retention * 3600)
+            results = pipe.execute()
+        except Exception as error:
+            print(f"Error flushing counters: {error}")
+            with self._lock:
+                self._flush_errors += 1
+                self._last_flush_failed = True
+                self._in_flight = {}
+                for name, counts in pending.items():
+                    merged = self._pending.setdefault(name, {})
+                    for minute, amount in counts.items():
+                        merged[minute] = merged.get(minute, 0) + amount
+            return
+
+        with self._lock:
+            self._flushes += 1
+            self._last_flush_failed = False
+            self._in_flight = {}
+            for name, total in zip(names, results):
+                self._known_totals[name] = int(total)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "flush_interval": self.flush_interval,
+                "flushes": self._flushes,
+                "flush_errors": self._flush_errors,
+                "last_flush_failed": self._last_flush_failed,
+                "pending": {name: self._pending_total(name) for name in self._pending}
+            }
+
+    def _load_totals(self, names):
+        """Read the stored totals of names from Redis in one MGET."""
+        try:
+            stored = self._client.mget(names)
+        except Exception as error:
+            raise CountersUnavailable(f"Could not read counter totals: {error}") from error
+        with self._lock:
+            for name, value in zip(names, stored):
+                # A flush that finished meanwhile already set a newer total.
+                self._known_totals.setdefault(name, int(value or 0))
+
+    def _pending_total(self, name):
+        """Increments not yet reflected in _known_totals: queued plus being flushed."""
+        return sum(self._pending.get(name, {}).values()) + self._in_flight.get(name, 0)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool with health-checked checkout."""
+
+    def __init__(self, connect, min_size=1, max_size=10, checkout_timeout=5.0, health_check_interval=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: require 0 <= min_size <= max_size and max_size >= 1")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._created = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def fill(self):
+        """Open connections until the pool holds at least min_size."""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._open()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._idle.append((connection, time.monotonic()))
+                self._condition.notify()
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+
+        while True:
+            connection, last_used = self._reserve(deadline)
+            if connection is None:
+                try:
+                    connection = self._open()
+                except Exception:
+                    self._free_slot()
+                    raise
+            elif not self._is_healthy(connection, last_used):
+                self._discard(connection)
+                continue
+
+            elapsed = time.monotonic() - start
+            with self._condition:
+                self._checkouts += 1
+                self._checkout_time_total += elapsed
+                self._checkout_time_max = max(self._checkout_time_max, elapsed)
+            return connection
+
+    def release(self, connection):
+        try:
+            if connection.closed:
+                raise psycopg2.InterfaceError("connection already closed")
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def metrics(self):
+        with self._condition:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "checkout_timeouts": self._timeouts,
+                "connections_created": self._created,
+                "connections_discarded": self._discarded,
+                "checkout_latency_avg_ms": round(self._checkout_time_total / self._checkouts * 1000, 3) if self._checkouts else 0,
+                "checkout_latency_max_ms": round(self._checkout_time_max * 1000, 3)
+            }
+
+    def _reserve(self, deadline):
+        """Take an idle connection or a free slot; (None, None) means open a new one."""
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    self._in_use += 1
+                    return connection, last_used
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._in_use += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.checkout_timeout}s")
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open(self):
+        connection = self._connect()
+        with self._condition:
+            self._created += 1
+        return connection
+
+    def _is_healthy(self, connection, last_used):
+        if connection.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.close()
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._discarded += 1
+        self._free_slot()
+
+    def _free_slot(self):
+        """Forget a checked-out connection so a waiter may open a replacement."""
+        with self._condition:
+            self._size -= 1
+            self._in_use -= 1
+            self._condition.notify()
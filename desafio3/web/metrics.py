@@ -0,0 +1,251 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# With several worker processes, each one writes its values to a file in
+# METRICS_DIR every METRICS_SYNC_INTERVAL seconds and /metrics sums them all.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_SYNC_INTERVAL = float(os.getenv('METRICS_SYNC_INTERVAL', 1.0))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(values, other):
+        for label_values, value in other.items():
+            values[label_values] = values.get(label_values, 0) + value
+
+    def render(self, values):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram per label set. observe() is a bisect and two
+    additions under a lock; buckets are only made cumulative in render().
+    """
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+    @staticmethod
+    def merge(series, other):
+        for label_values, (counts, total) in other.items():
+            if label_values in series:
+                merged_counts, merged_total = series[label_values]
+                counts = [a + b for a, b in zip(merged_counts, counts)]
+                total += merged_total
+            series[label_values] = (list(counts), total)
+
+    def render(self, series):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                bucket_label = _labels(self.label_names, label_values, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket_label} {cumulative}")
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    The metrics of a process. Given a directory, the values of every process
+    that shares it are summed on render(): each one writes its own file there,
+    every sync_interval seconds and at exit, and the files of exited processes
+    stay, so totals never go backwards when a worker is recycled. Whoever
+    starts the processes empties the directory first (see gunicorn.conf.py).
+    """
+
+    def __init__(self, directory=None, sync_interval=1.0):
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self._metrics = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+
+    def counter(self, name, help_text, label_names=()):
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def start_sync(self):
+        """Start writing this process's values to directory; once per process, as workers fork."""
+        if self.directory is None or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._path = os.path.join(self.directory, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+            threading.Thread(target=self._run_sync, name='metrics-sync', daemon=True).start()
+            atexit.register(self.write)
+
+    def write(self):
+        """Replace this process's file with its current values."""
+        data = {
+            metric.name: [[list(labels), value] for labels, value in metric.snapshot().items()]
+            for metric in self._metrics
+        }
+        temporary = f"{self._path}.tmp"
+        with open(temporary, 'w') as file:
+            json.dump(data, file)
+        os.replace(temporary, self._path)
+
+    def render(self):
+        if self.directory is None:
+            values = {metric.name: metric.snapshot() for metric in self._metrics}
+        else:
+            self.start_sync()
+            self.write()
+            values = self._read_all()
+
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(values.get(metric.name, {})))
+        return '\n'.join(lines) + '\n'
+
+    def _read_all(self):
+        values = {metric.name: {} for metric in self._metrics}
+        merges = {metric.name: metric.merge for metric in self._metrics}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, series in data.items():
+                if name in merges:
+                    merges[name](values[name], {tuple(labels): value for labels, value in series})
+        return values
+
+    def _run_sync(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.write()
+            except OSError as error:
+                print(f"Error writing metrics: {error}")
+
+
+registry = Registry(METRICS_DIR, METRICS_SYNC_INTERVAL)
+
+
+def instrument(app):
+    """
+    Record a request count and latency for every route of app and serve all
+    metrics of the registry from GET /metrics in the Prometheus text format.
+
+    Routes are labelled with their URL rule (e.g. /api/users/<int:user_id>),
+    so the number of series does not grow with ids; unmatched paths share the
+    label "unmatched". Values are per process unless METRICS_DIR is set; then
+    they are summed over every process writing there.
+    """
+    requests_total = registry.counter(
+        'http_requests_total',
+        'HTTP requests by route, method and status code.',
+        ('method', 'route', 'status')
+    )
+    request_duration = registry.histogram(
+        'http_request_duration_seconds',
+        'Time to build the HTTP response, by route and method.',
+        ('method', 'route')
+    )
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        registry.start_sync()
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            request_duration.observe(time.perf_counter() - started, request.method, route)
+            requests_total.inc(request.method, route, str(response.status_code))
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), mimetype=None, content_type=CONTENT_TYPE)
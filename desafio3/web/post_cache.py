@@ -0,0 +1,256 @@
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from serialization import JSONCodec
+
+KEY_PREFIX = 'posts_cache'
+
+CachedPage = namedtuple('CachedPage', ['posts_json', 'next_after_id', 'source', 'compressed'])
+
+# Resolves the current page key from the generation counters and reads the
+# page plus every post it references in a single round trip. With ARGV[4]
+# set, the page's compressed copy is returned instead of the posts when
+# there is one.
+READ_PAGE_SCRIPT = """
+local all_gen = redis.call('GET', KEYS[1]) or '0'
+local head_gen = redis.call('GET', KEYS[2]) or '0'
+local page_key
+if ARGV[2] == '' then
+    page_key = ARGV[1] .. ':page:' .. all_gen .. ':head:' .. head_gen .. ':' .. ARGV[3]
+else
+    page_key = ARGV[1] .. ':page:' .. all_gen .. ':after:' .. ARGV[2] .. ':' .. ARGV[3]
+end
+local page = redis.call('GET', page_key)
+if not page then
+    return {page_key}
+end
+if ARGV[4] ~= '' then
+    local compressed = redis.call('GET', page_key .. ':compressed')
+    if compressed then
+        return {page_key, page, {}, compressed}
+    end
+end
+local posts = {}
+for i, post_id in ipairs(cjson.decode(page)['ids']) do
+    posts[i] = redis.call('GET', ARGV[1] .. ':post:' .. post_id) or ''
+end
+return {page_key, page, posts}
+"""
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class PostCache:
+    """
+    Read-through cache for posts.
+
+    Each post is stored under its own key and each list page stores only the
+    ids it contains. Pages are namespaced by generation counters: inserting a
+    post bumps the head generation, which only orphans pages that start at the
+    newest post (keyset pages with ?after_id= cannot contain newer posts), and
+    invalidate_all() bumps the global generation. Orphaned keys expire by TTL.
+    Concurrent misses on the same page are collapsed with a Redis lock so only
+    one caller queries the database.
+
+    Posts are stored as compact JSON with sorted keys and handed back still
+    encoded, so a hit never decodes them and the caller can splice them into
+    the response body as they are. The client must not decode responses.
+
+    If compress_page is given, every page written also stores
+    compress_page(posts_json) next to it, and get_page(compressed=True)
+    returns that instead of the posts, so hits are served without
+    compressing them again.
+    """
+
+    def __init__(self, client, ttl=60, lock_ttl=5.0, lock_wait=2.0, poll_interval=0.05, codec=None,
+                 compress_page=None):
+        self._client = client
+        self._codec = codec or JSONCodec()
+        self._compress_page = compress_page
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+
+        self._read_page_script = None
+
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "bypassed": 0,
+            "invalidations": 0
+        }
+
+    def get_page(self, after_id, limit, load_page, compressed=False):
+        """
+        Return a CachedPage, where posts_json is a list with each post as JSON
+        bytes. With compressed=True, compressed holds the page's
+        compress_page() output, if any, and posts_json is None on hits that
+        found it.
+
+        load_page() must return (posts, next_after_id) from the database, with
+        each post already JSON serializable.
+        """
+        client = self._client
+        try:
+            page_key, cached = self._read_page(client, after_id, limit, compressed)
+        except Exception as error:
+            print(f"Error reading posts cache: {error}")
+            self._count("bypassed")
+            posts_json, next_after_id, _ = self._load(load_page)
+            return CachedPage(posts_json, next_after_id, "database", None)
+
+        if cached:
+            self._count("hits")
+            return cached._replace(source="cache")
+
+        self._count("misses")
+        lock_key = f"{page_key}:lock"
+        token = uuid.uuid4().hex
+        try:
+            acquired = bool(client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000)))
+        except Exception as error:
+            print(f"Error locking posts cache: {error}")
+            acquired = None
+
+        if acquired:
+            try:
+                posts_json, next_after_id, ids = self._load(load_page)
+                page_compressed = self._compress_page(posts_json) if self._compress_page else None
+                self._write_page(client, page_key, posts_json, ids, next_after_id, page_compressed)
+                return CachedPage(posts_json, next_after_id, "database", page_compressed if compressed else None)
+            finally:
+                self._release_lock(client, lock_key, token)
+
+        if acquired is False:
+            cached = self._wait_for_page(client, after_id, limit, lock_key, compressed)
+            if cached:
+                self._count("coalesced")
+                return cached._replace(source="cache")
+
+        posts_json, next_after_id, _ = self._load(load_page)
+        return CachedPage(posts_json, next_after_id, "database", None)
+
+    def add_post(self, post):
+        """Cache a newly inserted post and invalidate the pages that start at the head."""
+        client = self._client
+        try:
+            pipe = client.pipeline()
+            pipe.setex(self._post_key(post['id']), self.ttl, self._encode(post))
+            pipe.incr(f"{KEY_PREFIX}:gen:head")
+            pipe.execute()
+            self._count("invalidations")
+        except Exception as error:
+            print(f"Error updating posts cache: {error}")
+
+    def invalidate_head(self):
+        """Invalidate the pages that start at the head, e.g. once after a batch of inserts."""
+        client = self._client
+        try:
+            client.incr(f"{KEY_PREFIX}:gen:head")
+            self._count("invalidations")
+        except Exception as error:
+            print(f"Error updating posts cache: {error}")
+
+    def invalidate_all(self):
+        client = self._client
+        try:
+            client.incr(f"{KEY_PREFIX}:gen:all")
+            self._count("invalidations")
+        except Exception as error:
+            print(f"Error updating posts cache: {error}")
+
+    def stats(self, redis_info=None):
+        """Local counters, plus eviction figures when given the output of INFO stats."""
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = round((counters["hits"] + counters["coalesced"]) / lookups, 4) if lookups else 0
+
+        if redis_info:
+            counters["redis_evicted_keys"] = redis_info.get('evicted_keys', 0)
+            counters["redis_expired_keys"] = redis_info.get('expired_keys', 0)
+        return counters
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _post_key(self, post_id):
+        return f"{KEY_PREFIX}:post:{post_id}"
+
+    def _encode(self, post):
+        return self._codec.dump_bytes(post, sort_keys=True)
+
+    def _load(self, load_page):
+        """Run load_page() and encode its posts: (posts_json, next_after_id, ids)."""
+        posts, next_after_id = load_page()
+        return [self._encode(post) for post in posts], next_after_id, [post['id'] for post in posts]
+
+    def _read_page(self, client, after_id, limit, compressed=False):
+        """Return (page_key, CachedPage without a source), or (page_key, None) on a miss."""
+        if self._read_page_script is None:
+            self._read_page_script = client.register_script(READ_PAGE_SCRIPT)
+
+        result = self._read_page_script(
+            keys=[f"{KEY_PREFIX}:gen:all", f"{KEY_PREFIX}:gen:head"],
+            args=[KEY_PREFIX, '' if after_id is None else after_id, limit or 'all', '1' if compressed else ''],
+            client=client
+        )
+        page_key = result[0].decode()
+        if len(result) == 1:
+            return page_key, None
+
+        next_after_id = self._codec.loads(result[1])['next_after_id']
+        if len(result) == 4:
+            return page_key, CachedPage(None, next_after_id, None, result[3])
+
+        posts = result[2]
+        if not all(posts):
+            return page_key, None
+        return page_key, CachedPage(posts, next_after_id, None, None)
+
+    def _wait_for_page(self, client, after_id, limit, lock_key, compressed=False):
+        """Poll for the page another caller is loading; None if the lock holder gave up."""
+        deadline = time.monotonic() + self.lock_wait
+        try:
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                _, cached = self._read_page(client, after_id, limit, compressed)
+                if cached:
+                    return cached
+                if not client.exists(lock_key):
+                    return None
+        except Exception as error:
+            print(f"Error reading posts cache: {error}")
+        return None
+
+    def _write_page(self, client, page_key, posts_json, ids, next_after_id, compressed=None):
+        try:
+            pipe = client.pipeline(transaction=False)
+            for post_id, post_json in zip(ids, posts_json):
+                pipe.setex(self._post_key(post_id), self.ttl, post_json)
+            pipe.setex(page_key, self.ttl, self._codec.dumps({
+                "ids": ids,
+                "next_after_id": next_after_id
+            }))
+            if compressed is not None:
+                pipe.setex(f"{page_key}:compressed", self.ttl, compressed)
+            pipe.execute()
+        except Exception as error:
+            print(f"Error writing posts cache: {error}")
+
+    def _release_lock(self, client, lock_key, token):
+        try:
+            client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as error:
+            print(f"Error unlocking posts cache: {error}")
@@ -0,0 +1,33 @@
+def parse_fields(value, allowed):
+    """
+    Parse a ?fields= value ("name,email" or a list of names) into a tuple of
+    field names, or None when it is missing or empty (whole records). id is
+    always included, first, so clients can still tell records apart and
+    keyset pages can still be followed. Raises ValueError on a name that is
+    not in allowed.
+    """
+    if value is None:
+        return None
+    names = value.split(',') if isinstance(value, str) else value
+    if not isinstance(names, list) or any(not isinstance(name, str) for name in names):
+        raise ValueError("fields must be a comma-separated string or a list of names")
+
+    names = [name.strip() for name in names if name.strip()]
+    if not names:
+        return None
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Valid: {', '.join(allowed)}")
+    return tuple(dict.fromkeys(['id'] + names))
+
+
+def project(record, fields):
+    """record with only fields (all of it when fields is None)."""
+    if fields is None:
+        return record
+    return {name: record[name] for name in fields if name in record}
+
+
+def fields_variant(fields):
+    """A stable tag for a projection, to tell its ETags apart from the whole records'."""
+    return '+'.join(sorted(fields)) if fields else None
@@ -0,0 +1,91 @@
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ('auto', 'orjson', 'json')
+
+
+class JSONCodec:
+    """
+    Compact JSON encoding and decoding, done by orjson when it is installed
+    and by the standard library otherwise.
+
+    backend='auto' picks orjson if available, 'json' always uses the standard
+    library and 'orjson' refuses to start without it.
+    """
+
+    def __init__(self, backend='auto'):
+        if backend not in BACKENDS:
+            raise ValueError(f"JSON backend must be one of {list(BACKENDS)}")
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError("JSON backend 'orjson' requested but orjson is not installed")
+        self.name = 'orjson' if backend != 'json' and orjson is not None else 'json'
+
+    def dumps(self, obj, default=None, sort_keys=False):
+        if self.name == 'orjson':
+            return orjson.dumps(obj, default=default, option=self._options(default, sort_keys)).decode()
+        return json.dumps(obj, default=default, sort_keys=sort_keys, separators=(',', ':'))
+
+    def dump_bytes(self, obj, default=None, sort_keys=False):
+        if self.name == 'orjson':
+            return orjson.dumps(obj, default=default, option=self._options(default, sort_keys))
+        return self.dumps(obj, default, sort_keys).encode()
+
+    def loads(self, data):
+        if self.name == 'orjson':
+            return orjson.loads(data)
+        return json.loads(data)
+
+    @staticmethod
+    def _options(default, sort_keys):
+        option = orjson.OPT_NON_STR_KEYS
+        if default is not None:
+            # Hand datetimes to default() instead of orjson's ISO format,
+            # as json.dumps would.
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """
+    Flask's default JSON provider with the encoding and decoding delegated to
+    a JSONCodec. Types, key order and compact output stay the same as
+    jsonify's; with orjson non-ASCII text is sent as UTF-8 instead of \\u
+    escapes. Calls with extra json.dumps arguments (e.g. indent in debug
+    mode) go to the standard library.
+    """
+
+    def __init__(self, app, codec):
+        super().__init__(app)
+        self.codec = codec
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.codec.dumps(obj, default=self.default, sort_keys=self.sort_keys)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return self.codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self.codec.dump_bytes(obj, default=self.default, sort_keys=self.sort_keys)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def use_json_codec(app, backend='auto'):
+    """Route jsonify() and request.get_json() of app through a JSONCodec and return it."""
+    codec = JSONCodec(backend)
+    app.json = CodecJSONProvider(app, codec)
+    return codec
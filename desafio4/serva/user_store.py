@@ -0,0 +1,208 @@
+import threading
+from datetime import datetime
+
+from projection import project
+
+
+class EmailAlreadyRegistered(Exception):
+    pass
+
+
+class UserStore:
+    """
+    In-memory user table with a primary index by id, a unique index by email
+    and secondary indexes by profile and active flag.
+
+    Lookups by id or email are O(1); filtered listings touch only the ids in
+    the matching index bucket. Ids come from a monotonic counter and are never
+    reused, even after a delete. Active and per-profile totals are maintained
+    on every write so summary() does not walk the users.
+
+    Every write also bumps a collection version, and records it as the
+    version of the user it touched, for ETags.
+    """
+
+    def __init__(self, users=(), profile_key=None):
+        self._profile_key = profile_key or (lambda profile: profile)
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_email = {}
+        self._by_profile = {}
+        self._by_active = {}
+        self._next_id = 1
+
+        self._active_total = 0
+        self._profile_counts = {}
+
+        self._version = 0
+        self._modified_at = datetime.now()
+        self._item_versions = {}
+
+        for user in users:
+            self._insert(dict(user))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def all(self):
+        with self._lock:
+            return list(self._by_id.values())
+
+    def get(self, user_id):
+        return self._by_id.get(user_id)
+
+    def version(self):
+        """Return (version, modified_at) of the last write to any user."""
+        with self._lock:
+            return self._version, self._modified_at
+
+    def item_version(self, user_id):
+        """Return (version, modified_at) of the last write to one user, or None if it does not exist."""
+        return self._item_versions.get(user_id)
+
+    def get_by_email(self, email):
+        user_id = self._by_email.get(email)
+        return self._by_id.get(user_id) if user_id is not None else None
+
+    def filter(self, active=None, profile=None, fields=None):
+        """Users matching every given criterion, in id order, with only fields if given."""
+        with self._lock:
+            buckets = []
+            if active is not None:
+                buckets.append(self._by_active.get(active, {}))
+            if profile is not None:
+                buckets.append(self._by_profile.get(self._profile_key(profile), {}))
+            if not buckets:
+                users = self._by_id.values()
+            else:
+                buckets.sort(key=len)
+                smallest, others = buckets[0], buckets[1:]
+                ids = [user_id for user_id in smallest if all(user_id in bucket for bucket in others)]
+                users = [self._by_id[user_id] for user_id in sorted(ids)]
+
+            if fields is None:
+                return list(users)
+            return [project(user, fields) for user in users]
+
+    def summary(self):
+        """Return (total, active, profile_counts) from the running counters."""
+        with self._lock:
+            return len(self._by_id), self._active_total, dict(self._profile_counts)
+
+    def check_consistency(self):
+        """
+        Recompute the summary from scratch and compare it with the running
+        counters. Returns a dict with 'consistent' and, for any mismatch, the
+        expected and actual values under 'drift'.
+        """
+        with self._lock:
+            total, active, profiles = self.summary()
+            expected_profiles = {}
+            for user in self._by_id.values():
+                expected_profiles[user['profile']] = expected_profiles.get(user['profile'], 0) + 1
+            expected = {
+                "total": len(self._by_id),
+                "active": sum(1 for user in self._by_id.values() if user['active']),
+                "profiles": expected_profiles
+            }
+
+        actual = {"total": total, "active": active, "profiles": profiles}
+        drift = {
+            name: {"expected": expected[name], "actual": actual[name]}
+            for name in expected
+            if expected[name] != actual[name]
+        }
+        return {"consistent": not drift, "drift": drift}
+
+    def create(self, fields):
+        """Insert a new user with the next id; fields must not contain 'id'."""
+        with self._lock:
+            if fields['email'] in self._by_email:
+                raise EmailAlreadyRegistered(fields['email'])
+            user = {"id": self._next_id}
+            user.update(fields)
+            self._insert(user)
+            return user
+
+    def update(self, user_id, changes):
+        """Apply changes to a user, keeping every index in sync. Returns None if not found."""
+        with self._lock:
+            user = self._by_id.get(user_id)
+            if user is None:
+                return None
+
+            self._check_index_keys(dict(user, **changes))
+            email = changes.get('email', user['email'])
+            owner = self._by_email.get(email)
+            if owner is not None and owner != user_id:
+                raise EmailAlreadyRegistered(email)
+
+            self._unindex(user)
+            user.update(changes)
+            self._index(user)
+            self._touch(user_id)
+            return user
+
+    def delete(self, user_id):
+        with self._lock:
+            user = self._by_id.pop(user_id, None)
+            if user is not None:
+                self._unindex(user)
+                self._item_versions.pop(user_id, None)
+                self._touch()
+            return user
+
+    def _insert(self, user):
+        self._check_index_keys(user)
+        if user['email'] in self._by_email:
+            raise EmailAlreadyRegistered(user['email'])
+        self._next_id = max(self._next_id, user['id'] + 1)
+        self._by_id[user['id']] = user
+        self._index(user)
+        self._touch(user['id'])
+
+    def _touch(self, user_id=None):
+        self._version += 1
+        self._modified_at = datetime.now()
+        if user_id is not None:
+            self._item_versions[user_id] = (self._version, self._modified_at)
+
+    def _check_index_keys(self, user):
+        """
+        Raise if user cannot be indexed (e.g. an unhashable active or profile),
+        before any write touches the indexes, so a bad value never leaves a
+        user half indexed or the running counters off.
+        """
+        hash((user['email'], user['active'], user['profile'], self._profile_key(user['profile'])))
+
+    def _index(self, user):
+        user_id = user['id']
+        self._by_email[user['email']] = user_id
+        self._by_profile.setdefault(self._profile_key(user['profile']), {})[user_id] = None
+        self._by_active.setdefault(user['active'], {})[user_id] = None
+
+        if user['active']:
+            self._active_total += 1
+        self._profile_counts[user['profile']] = self._profile_counts.get(user['profile'], 0) + 1
+
+    def _unindex(self, user):
+        user_id = user['id']
+        self._by_email.pop(user['email'], None)
+        self._discard(self._by_profile, self._profile_key(user['profile']), user_id)
+        self._discard(self._by_active, user['active'], user_id)
+
+        if user['active']:
+            self._active_total -= 1
+        remaining = self._profile_counts[user['profile']] - 1
+        if remaining:
+            self._profile_counts[user['profile']] = remaining
+        else:
+            del self._profile_counts[user['profile']]
+
+    @staticmethod
+    def _discard(index, key, user_id):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(user_id, None)
+            if not bucket:
+                del index[key]
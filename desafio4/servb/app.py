@@ -1,17 +1,69 @@
-from flask import Flask, jsonify
-import requests
+from flask import Flask, Response, jsonify, request
 from datetime import datetime
-import time
+import os
+
+from compression import use_compression
+from health_monitor import HealthMonitor
+from metrics import instrument, registry
+from serialization import use_json_codec
+from upstream import UpstreamSessions, parse_pool_sizes
+from user_formats import UserFormatCache, UserReport
 
 app = Flask(__name__)
+instrument(app)
+json_codec = use_json_codec(app, os.getenv('JSON_BACKEND', 'auto'))
+use_compression(app, int(os.getenv('COMPRESSION_MIN_SIZE', 1024)), int(os.getenv('COMPRESSION_LEVEL', 6)))
+
+SERVICE_A_URL = os.getenv('SERVICE_A_URL', "http://service-a:5001")
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 32))
+UPSTREAM_POOL_SIZES = parse_pool_sizes(os.getenv('UPSTREAM_POOL_SIZES'))
+UPSTREAM_POOL_BLOCK = os.getenv('UPSTREAM_POOL_BLOCK', 'false').lower() == 'true'
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))
+HEALTH_CHECK_HISTORY = int(os.getenv('HEALTH_CHECK_HISTORY', 20))
+USER_FORMAT_CACHE_SIZE = int(os.getenv('USER_FORMAT_CACHE_SIZE', 10000))
+
+upstream_request_duration = registry.histogram(
+    'upstream_request_duration_seconds',
+    'Time spent in calls to upstream services, by host, method and outcome.',
+    ('upstream', 'method', 'outcome')
+)
+
+def observe_upstream(host, method, outcome, seconds):
+    upstream_request_duration.observe(seconds, host, method, outcome)
+
+upstreams = UpstreamSessions(
+    pool_size=UPSTREAM_POOL_SIZE,
+    pool_sizes=UPSTREAM_POOL_SIZES,
+    pool_block=UPSTREAM_POOL_BLOCK,
+    observe=observe_upstream
+)
+
+def probe_service_a(url, timeout):
+    response = upstreams.get(url, timeout=timeout)
+    try:
+        data = json_codec.loads(response.content)
+    except Exception:
+        data = {"message": response.text}
+    return data, response.status_code
+
+# Clock-independent parts of the formatted users, reused across requests
+# until Service A returns different values for the user.
+user_formats = UserFormatCache(max_entries=USER_FORMAT_CACHE_SIZE)
 
-SERVICE_A_URL = "http://service-a:5001"
+health_monitor = HealthMonitor(
+    {"service_a": f"{SERVICE_A_URL}/health"},
+    probe_service_a,
+    interval=HEALTH_CHECK_INTERVAL,
+    timeout=HEALTH_CHECK_TIMEOUT,
+    history_size=HEALTH_CHECK_HISTORY
+)
 
 def get_users_service_a():
     try:
-        response = requests.get(f"{SERVICE_A_URL}/api/users", timeout=5)
+        response = upstreams.get(f"{SERVICE_A_URL}/api/users", timeout=5)
         if response.status_code == 200:
-            return response.json()
+            return json_codec.loads(response.content)
         else:
             return None
     except Exception as error:
@@ -20,20 +72,9 @@ def get_users_service_a():
 
 def get_user_service_a(user_id):
     try:
-        response = requests.get(f"{SERVICE_A_URL}/api/users/{user_id}", timeout=5)
+        response = upstreams.get(f"{SERVICE_A_URL}/api/users/{user_id}", timeout=5)
         if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except Exception as error:
-        print(f"Error connecting to Service A: {error}")
-        return None
-
-def get_statistics_service_a():
-    try:
-        response = requests.get(f"{SERVICE_A_URL}/api/users/statistics/summary", timeout=5)
-        if response.status_code == 200:
-            return response.json()
+            return json_codec.loads(response.content)
         else:
             return None
     except Exception as error:
@@ -42,11 +83,8 @@ def get_statistics_service_a():
 
 @app.route('/health', methods=['GET'])
 def health():
-    try:
-        response = requests.get(f"{SERVICE_A_URL}/health", timeout=2)
-        service_a_status = "available" if response.status_code == 200 else "unavailable"
-    except Exception:
-        service_a_status = "unavailable"
+    check = health_monitor.snapshot()["service_a"]
+    service_a_status = "available" if check["healthy"] else "unavailable"
 
     return jsonify({
         "status": "healthy",
@@ -67,83 +105,70 @@ def users_formatted():
             }), 503
 
         users = data.get('users', [])
+        now = datetime.now()
 
         formatted_users = []
-        for user in users:
-            registration_date = datetime.fromisoformat(user['registration_date'])
-            days_since_registration = (datetime.now() - registration_date).days
-
-            formatted_users.append({
-                "id": user['id'],
-                "name": user['name'],
-                "email": user['email'],
-                "status": "Active" if user['active'] else "Inactive",
-                "profile": user['profile'].capitalize(),
-                "registration": f"{days_since_registration} days ago" if days_since_registration > 0 else "Today",
-                "complete_date": user['registration_date']
-            })
+        for entry in user_formats.get_many(users):
+            days_since_registration = entry.age(now).days
+            formatted_users.append(dict(
+                entry.formatted,
+                registration=f"{days_since_registration} days ago" if days_since_registration > 0 else "Today"
+            ))
 
         return jsonify({
             "total": len(formatted_users),
             "users": formatted_users,
             "source": "Service A",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now.isoformat()
         }), 200
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 
+def report_trailer(report):
+    return {
+        "title": "User Report",
+        "summary": report.summary(),
+        "profile_distribution": report.by_profile,
+        "source": "Consumed from Service A",
+        "timestamp": report.now.isoformat()
+    }
+
+def stream_report(report, users):
+    """Yield the report as NDJSON: one line per user as it is formatted, then the summary."""
+    for group, row in report.rows(users):
+        yield app.json.dumps({"group": group, "user": row}) + "\n"
+    yield app.json.dumps(report_trailer(report)) + "\n"
+
 @app.route('/api/users/report', methods=['GET'])
 def users_report():
+    stream = request.args.get('stream')
+    if stream is not None and stream != 'ndjson':
+        return jsonify({"error": "stream must be 'ndjson'"}), 400
+
     try:
         user_data = get_users_service_a()
-        stats_data = get_statistics_service_a()
 
-        if not user_data or not stats_data:
+        if not user_data:
             return jsonify({
                 "error": "Could not connect to Service A"
             }), 503
 
         users = user_data.get('users', [])
-        stats = stats_data
+        report = UserReport(user_formats, datetime.now())
 
-        active_users = [user for user in users if user['active']]
-        inactive_users = [user for user in users if not user['active']]
+        if stream:
+            return Response(stream_report(report, users), mimetype='application/x-ndjson')
 
         active_formatted = []
-        for user in active_users:
-            registration_date = datetime.fromisoformat(user['registration_date'])
-            days = (datetime.now() - registration_date).days
-            active_formatted.append({
-                "name": user['name'],
-                "email": user['email'],
-                "profile": user['profile'].upper(),
-                "active_for_days": days
-            })
-
         inactive_formatted = []
-        for user in inactive_users:
-            inactive_formatted.append({
-                "name": user['name'],
-                "email": user['email'],
-                "profile": user['profile'].upper()
-            })
-
-        report = {
-            "title": "User Report",
-            "summary": {
-                "total_users": stats['total_users'],
-                "active_users": stats['active'],
-                "inactive_users": stats['inactive'],
-                "active_percentage": round((stats['active'] / stats['total_users'] * 100), 2) if stats['total_users'] > 0 else 0
-            },
-            "profile_distribution": stats['by_profile'],
-            "active_users": active_formatted,
-            "inactive_users": inactive_formatted,
-            "source": "Consumed from Service A",
-            "timestamp": datetime.now().isoformat()
-        }
-
-        return jsonify(report), 200
+        for group, row in report.rows(users):
+            (active_formatted if group == "active" else inactive_formatted).append(row)
+
+        return jsonify(dict(
+            report_trailer(report),
+            active_users=active_formatted,
+            inactive_users=inactive_formatted
+        )), 200
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 
@@ -157,29 +182,22 @@ def user_details(user_id):
                 "error": f"User {user_id} not found"
             }), 404
 
-        user = data.get('user')
-        registration_date = datetime.fromisoformat(user['registration_date'])
-        days_since_registration = (datetime.now() - registration_date).days
-        hours_since_registration = (datetime.now() - registration_date).seconds // 3600
-
-        details = {
-            "id": user['id'],
-            "name": user['name'],
-            "email": user['email'],
-            "profile": user['profile'].upper(),
-            "status": {
-                "active": user['active'],
-                "label": "Active" if user['active'] else "Inactive"
-            },
-            "registration_time": {
+        entry = user_formats.get(data.get('user'))
+        now = datetime.now()
+        age = entry.age(now)
+        days_since_registration = age.days
+        hours_since_registration = age.seconds // 3600
+
+        details = dict(
+            entry.details,
+            registration_time={
                 "days": days_since_registration,
                 "hours": hours_since_registration,
                 "formatted": f"{days_since_registration} days and {hours_since_registration} hours"
             },
-            "complete_registration_date": user['registration_date'],
-            "source": "Consumed from Service A",
-            "timestamp": datetime.now().isoformat()
-        }
+            source="Consumed from Service A",
+            timestamp=now.isoformat()
+        )
 
         return jsonify(details), 200
     except Exception as error:
@@ -187,20 +205,13 @@ def user_details(user_id):
 
 @app.route('/api/services-status', methods=['GET'])
 def services_status():
-    try:
-        start_time = time.time()
-        response = requests.get(f"{SERVICE_A_URL}/health", timeout=5)
-        response_time = (time.time() - start_time) * 1000
+    check = health_monitor.snapshot()["service_a"]
 
-        if response.status_code == 200:
-            service_a_info = response.json()
-            status = "available"
-        else:
-            service_a_info = {"error": "Status not 200"}
-            status = "unavailable"
-    except Exception as error:
-        service_a_info = {"error": str(error)}
-        response_time = None
+    if check["healthy"]:
+        service_a_info = check["info"]
+        status = "available"
+    else:
+        service_a_info = {"error": check.get("error", "Status not 200")}
         status = "unavailable"
 
     return jsonify({
@@ -211,11 +222,20 @@ def services_status():
         "service_a": {
             "url": SERVICE_A_URL,
             "status": status,
-            "response_time_ms": response_time,
+            "response_time_ms": check.get("latency_ms"),
+            "checked_at": check.get("checked_at"),
+            "stale": check["stale"],
+            "history": check["history"],
             "info": service_a_info
         },
+        "upstream_connections": upstreams.metrics(),
+        "user_format_cache": user_formats.stats(),
         "timestamp": datetime.now().isoformat()
     }), 200
 
+def start_worker():
+    health_monitor.start()
+
 if __name__ == '__main__':
+    start_worker()
     app.run(host='0.0.0.0', port=5002, debug=False)
\ No newline at end of file
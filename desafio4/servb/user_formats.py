@@ -0,0 +1,142 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# The Service A fields the formatted views are built from.
+SOURCE_FIELDS = ('name', 'email', 'active', 'profile', 'registration_date')
+
+
+class FormattedUser:
+    """The parts of a user's formatted views that do not depend on the clock."""
+
+    __slots__ = ('registration_date', 'formatted', 'report', 'details')
+
+    def __init__(self, user):
+        self.registration_date = datetime.fromisoformat(user['registration_date'])
+        label = "Active" if user['active'] else "Inactive"
+        profile_upper = user['profile'].upper()
+
+        self.formatted = {
+            "id": user['id'],
+            "name": user['name'],
+            "email": user['email'],
+            "status": label,
+            "profile": user['profile'].capitalize(),
+            "complete_date": user['registration_date']
+        }
+        self.report = {
+            "name": user['name'],
+            "email": user['email'],
+            "profile": profile_upper
+        }
+        self.details = {
+            "id": user['id'],
+            "name": user['name'],
+            "email": user['email'],
+            "profile": profile_upper,
+            "status": {
+                "active": user['active'],
+                "label": label
+            },
+            "complete_registration_date": user['registration_date']
+        }
+
+    def age(self, now):
+        return now - self.registration_date
+
+
+class UserFormatCache:
+    """
+    LRU of FormattedUser by user id, holding at most max_entries users.
+
+    Service A has no version field, so the tuple of SOURCE_FIELDS is the
+    version: an entry is reused while those values are unchanged and rebuilt
+    as soon as any of them differs.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, user):
+        return self.get_many([user])[0]
+
+    def get_many(self, users):
+        """FormattedUser for each user, in order, under a single lock acquisition."""
+        entries = self._entries
+        result = []
+        with self._lock:
+            for user in users:
+                user_id = user['id']
+                version = tuple(user[field] for field in SOURCE_FIELDS)
+                cached = entries.get(user_id)
+                if cached is not None and cached[0] == version:
+                    entries.move_to_end(user_id)
+                    self._hits += 1
+                    result.append(cached[1])
+                    continue
+
+                self._misses += 1
+                formatted = FormattedUser(user)
+                entries[user_id] = (version, formatted)
+                entries.move_to_end(user_id)
+                if len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+                    self._evictions += 1
+                result.append(formatted)
+        return result
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0
+            }
+
+
+class UserReport:
+    """
+    Builds the user report in a single pass: rows() formats each user for its
+    group (active or inactive) while counting the totals and the profile
+    distribution, so summary() needs no second walk and no statistics call
+    to Service A. Users go through the format cache chunk_size at a time.
+    """
+
+    def __init__(self, format_cache, now, chunk_size=500):
+        self._format_cache = format_cache
+        self.now = now
+        self.chunk_size = chunk_size
+        self.total = 0
+        self.active = 0
+        self.by_profile = {}
+
+    def rows(self, users):
+        """Yield (group, row) for each user, with group "active" or "inactive"."""
+        for start in range(0, len(users), self.chunk_size):
+            chunk = users[start:start + self.chunk_size]
+            for user, entry in zip(chunk, self._format_cache.get_many(chunk)):
+                self.total += 1
+                self.by_profile[user['profile']] = self.by_profile.get(user['profile'], 0) + 1
+                if user['active']:
+                    self.active += 1
+                    yield "active", dict(entry.report, active_for_days=entry.age(self.now).days)
+                else:
+                    yield "inactive", entry.report
+
+    def summary(self):
+        """Totals of the users seen by rows() so far."""
+        return {
+            "total_users": self.total,
+            "active_users": self.active,
+            "inactive_users": self.total - self.active,
+            "active_percentage": round((self.active / self.total * 100), 2) if self.total > 0 else 0
+        }
@@ -1,101 +1,323 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, make_response, request
 import requests
+from werkzeug.http import quote_etag, unquote_etag
 from datetime import datetime
+from functools import partial, wraps
 import os
 
+from circuit_breaker import CircuitBreakers
+from compression import matching_etag, use_compression
+from fanout import Deadline, FanOut
+from health_monitor import HealthMonitor
+from metrics import instrument, registry
+from response_cache import ResponseCache
+from serialization import use_json_codec
+from upstream import UpstreamSessions, parse_pool_sizes
+
 app = Flask(__name__)
+instrument(app)
+json_codec = use_json_codec(app, os.getenv('JSON_BACKEND', 'auto'))
+use_compression(app, int(os.getenv('COMPRESSION_MIN_SIZE', 1024)), int(os.getenv('COMPRESSION_LEVEL', 6)))
 
 USERS_SERVICE_URL = os.getenv('USERS_SERVICE_URL', 'http://localhost:5001')
 ORDERS_SERVICE_URL = os.getenv('ORDERS_SERVICE_URL', 'http://localhost:5002')
 REQUEST_TIMEOUT = 5
+COMPOSITION_DEADLINE = float(os.getenv('COMPOSITION_DEADLINE', 10))
+FANOUT_MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', 32))
+FANOUT_MAX_CONCURRENCY = int(os.getenv('FANOUT_MAX_CONCURRENCY', 8))
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 32))
+UPSTREAM_POOL_SIZES = parse_pool_sizes(os.getenv('UPSTREAM_POOL_SIZES'))
+UPSTREAM_POOL_BLOCK = os.getenv('UPSTREAM_POOL_BLOCK', 'false').lower() == 'true'
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', 0.5))
+CIRCUIT_WINDOW = float(os.getenv('CIRCUIT_WINDOW', 30))
+CIRCUIT_OPEN_TIMEOUT = float(os.getenv('CIRCUIT_OPEN_TIMEOUT', 15))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', 1))
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))
+HEALTH_CHECK_HISTORY = int(os.getenv('HEALTH_CHECK_HISTORY', 20))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 5))
+RESPONSE_CACHE_STATS_TTL = float(os.getenv('RESPONSE_CACHE_STATS_TTL', 15))
+UPSTREAM_VALIDATOR_MAX_ENTRIES = int(os.getenv('UPSTREAM_VALIDATOR_MAX_ENTRIES', 1024))
+UPSTREAM_VALIDATOR_TTL = float(os.getenv('UPSTREAM_VALIDATOR_TTL', 300))
+
+DEADLINE_EXCEEDED = ({"error": "Gateway deadline exceeded"}, 504)
+
+fanout = FanOut(max_workers=FANOUT_MAX_WORKERS, max_concurrency=FANOUT_MAX_CONCURRENCY)
+
+upstream_request_duration = registry.histogram(
+    'upstream_request_duration_seconds',
+    'Time spent in calls to upstream services, by host, method and outcome.',
+    ('upstream', 'method', 'outcome')
+)
+
+
+def observe_upstream(host, method, outcome, seconds):
+    upstream_request_duration.observe(seconds, host, method, outcome)
+
+
+upstreams = UpstreamSessions(
+    pool_size=UPSTREAM_POOL_SIZE,
+    pool_sizes=UPSTREAM_POOL_SIZES,
+    pool_block=UPSTREAM_POOL_BLOCK,
+    observe=observe_upstream
+)
+breakers = CircuitBreakers(
+    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    failure_rate=CIRCUIT_FAILURE_RATE,
+    window=CIRCUIT_WINDOW,
+    open_timeout=CIRCUIT_OPEN_TIMEOUT,
+    half_open_probes=CIRCUIT_HALF_OPEN_PROBES
+)
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+# ETag and body of the last 200 for each upstream GET. Entries are always
+# revalidated, so the TTL only bounds how long an unused body is kept.
+upstream_validators = ResponseCache(max_entries=UPSTREAM_VALIDATOR_MAX_ENTRIES)
+upstream_revalidations = registry.counter(
+    'upstream_revalidations_total',
+    'Upstream GETs sent with If-None-Match, by outcome (not_modified, modified).',
+    ('outcome',)
+)
+
+
+def cached_response(ttl, *tags):
+    """
+    Serve a GET route from response_cache for ttl seconds.
+
+    tags name the resources the response is built from and may use the route's
+    URL parameters, e.g. 'users:{user_id}'. Only 200 responses are stored,
+    with their ETag, and a matching If-None-Match gets a 304 on hits and misses.
+    A view marks a 200 it must not store (e.g. one built without a failed
+    upstream) with Cache-Control: no-store.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            resource_tags = [tag.format(**kwargs) for tag in tags]
+            key = (request.method, request.path, tuple(sorted(request.args.items(multi=True))))
+
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, etag = cached
+                response = app.response_class(body, status=200, mimetype='application/json')
+                if etag is not None:
+                    response.set_etag(etag)
+                    response.headers['Cache-Control'] = 'no-cache'
+                response.headers['X-Cache'] = 'HIT'
+                return not_modified_if_matching(response)
+
+            generations = response_cache.generations(resource_tags)
+            response = make_response(view(**kwargs))
+            if response.status_code == 200 and not response.cache_control.no_store:
+                response_cache.set(key, (response.get_data(), response.get_etag()[0]), ttl, resource_tags, generations)
+            response.headers['X-Cache'] = 'MISS'
+            return not_modified_if_matching(response)
+        return wrapper
+    return decorator
+
+
+def invalidates(*tags):
+    """Invalidate the cached responses tagged with tags once a write route succeeds."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            response = make_response(view(**kwargs))
+            if response.status_code < 400:
+                response_cache.invalidate(*[tag.format(**kwargs) for tag in tags])
+            return response
+        return wrapper
+    return decorator
+
+
+def make_request(method, url, data=None, params=None, timeout=REQUEST_TIMEOUT):
+    response_data, status_code, _ = make_versioned_request(method, url, data, params, timeout)
+    return response_data, status_code
+
+
+def make_versioned_request(method, url, data=None, params=None, timeout=REQUEST_TIMEOUT):
+    """
+    make_request() that also returns the strong ETag of a 200 GET response,
+    or None.
+
+    GETs are revalidated: if an earlier response for the same URL and params
+    had an ETag, it is sent as If-None-Match and a 304 reuses the body kept
+    in upstream_validators instead of downloading it again.
+    """
+    if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+        return {"error": "HTTP method not supported"}, 400, None
+    if timeout <= 0:
+        return DEADLINE_EXCEEDED + (None,)
+
+    breaker = breakers.for_url(url)
+    if not breaker.allow():
+        return {"error": f"Service unavailable (circuit open): {url}"}, 503, None
+
+    validator_key = None
+    validator = None
+    headers = None
+    if method == 'GET':
+        validator_key = (url, tuple(sorted((params or {}).items())))
+        validator = upstream_validators.get(validator_key)
+        if validator is not None:
+            headers = {'If-None-Match': quote_etag(validator[0])}
 
-
-def make_request(method, url, data=None, params=None):
     try:
         if method == 'GET':
-            response = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            response = upstreams.request('GET', url, params=params, headers=headers, timeout=timeout)
         elif method == 'POST':
-            response = requests.post(url, json=data, timeout=REQUEST_TIMEOUT)
+            response = upstreams.request('POST', url, json=data, timeout=timeout)
         elif method == 'PUT':
-            response = requests.put(url, json=data, timeout=REQUEST_TIMEOUT)
-        elif method == 'DELETE':
-            response = requests.delete(url, timeout=REQUEST_TIMEOUT)
+            response = upstreams.request('PUT', url, json=data, timeout=timeout)
         else:
-            return {"error": "HTTP method not supported"}, 400
-
-        if response.status_code == 204:
-            return {}, 204
-
-        try:
-            response_data = response.json()
-        except Exception:
-            response_data = {"message": response.text}
-
-        return response_data, response.status_code
-
+            response = upstreams.request('DELETE', url, timeout=timeout)
     except requests.exceptions.Timeout:
-        return {"error": f"Timeout connecting to service: {url}"}, 504
+        breaker.record_failure()
+        return {"error": f"Timeout connecting to service: {url}"}, 504, None
     except requests.exceptions.ConnectionError:
-        return {"error": f"Error connecting to service: {url}"}, 503
+        breaker.record_failure()
+        return {"error": f"Error connecting to service: {url}"}, 503, None
     except Exception as error:
-        return {"error": f"Request error: {str(error)}"}, 500
+        breaker.record_failure()
+        return {"error": f"Request error: {str(error)}"}, 500, None
 
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
 
-def check_services():
-    try:
-        users_response = requests.get(f"{USERS_SERVICE_URL}/health", timeout=REQUEST_TIMEOUT)
-        orders_response = requests.get(f"{ORDERS_SERVICE_URL}/health", timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304 and validator is not None:
+        upstream_revalidations.inc('not_modified')
+        upstream_validators.set(validator_key, validator, UPSTREAM_VALIDATOR_TTL)
+        etag, response_data = validator
+        return response_data, 200, etag
 
-        return {
-            "users": users_response.status_code == 200,
-            "orders": orders_response.status_code == 200
-        }
+    if response.status_code == 204:
+        return {}, 204, None
+
+    try:
+        response_data = json_codec.loads(response.content)
     except Exception:
-        return {
-            "users": False,
-            "orders": False
-        }
+        response_data = {"message": response.text}
+
+    etag = None
+    if validator_key is not None and response.status_code == 200:
+        if validator is not None:
+            upstream_revalidations.inc('modified')
+        etag, weak = unquote_etag(response.headers.get('ETag'))
+        if etag is not None and not weak:
+            upstream_validators.set(validator_key, (etag, response_data), UPSTREAM_VALIDATOR_TTL)
+        else:
+            etag = None
+
+    return response_data, response.status_code, etag
+
+
+def etag_response(data, status_code, etag):
+    """
+    jsonify(data) carrying the upstream ETag. The tag stays valid for the
+    gateway's body, which is built from that upstream body alone.
+    """
+    response = make_response(jsonify(data), status_code)
+    if etag is not None and status_code == 200:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def fields_param(name='fields'):
+    """The client's ?fields= projection as upstream params, so the service that owns the records applies it."""
+    fields = request.args.get(name)
+    return {'fields': fields} if fields else {}
+
+
+def not_modified_if_matching(response):
+    """Replace a 200 with 304 Not Modified when the client's If-None-Match names its ETag."""
+    etag, _ = response.get_etag()
+    held = matching_etag(request.if_none_match, etag) if etag is not None else None
+    if response.status_code != 200 or held is None:
+        return response
+
+    not_modified = app.response_class(status=304)
+    not_modified.set_etag(held)
+    for header in ('Cache-Control', 'X-Cache'):
+        if header in response.headers:
+            not_modified.headers[header] = response.headers[header]
+    return not_modified
+
+
+def fan_out(calls, deadline):
+    """Run (method, url) calls concurrently and return [(data, status_code), ...] in order."""
+    tasks = [partial(make_request, method, url) for method, url in calls]
+    return fanout.run(tasks, deadline, REQUEST_TIMEOUT, DEADLINE_EXCEEDED)
+
+
+def probe_service(url, timeout):
+    return make_request('GET', url, timeout=timeout)
+
+
+health_monitor = HealthMonitor(
+    {
+        "users": f"{USERS_SERVICE_URL}/health",
+        "orders": f"{ORDERS_SERVICE_URL}/health"
+    },
+    probe_service,
+    interval=HEALTH_CHECK_INTERVAL,
+    timeout=HEALTH_CHECK_TIMEOUT,
+    history_size=HEALTH_CHECK_HISTORY
+)
 
 @app.route('/health', methods=['GET'])
 def health():
-    services = check_services()
+    checks = health_monitor.snapshot()
+    services = {name: check["healthy"] for name, check in checks.items()}
     status_value = "healthy" if all(services.values()) else "degraded"
 
     return jsonify({
         "status": status_value,
         "service": "API Gateway",
         "services": services,
+        "service_checks": checks,
+        "upstream_connections": upstreams.metrics(),
+        "response_cache": response_cache.stats(),
+        "upstream_validators": upstream_validators.stats(),
+        "circuit_breakers": breakers.snapshot(),
         "timestamp": datetime.now().isoformat()
     }), 200
 
 @app.route('/users', methods=['GET'])
+@cached_response(RESPONSE_CACHE_TTL, 'users')
 def gateway_list_users():
     params = {}
     if request.args.get('active'):
         params['active'] = request.args.get('active')
     if request.args.get('profile'):
         params['profile'] = request.args.get('profile')
+    params.update(fields_param())
 
-    data, status_code = make_request(
+    data, status_code, etag = make_versioned_request(
         'GET',
         f"{USERS_SERVICE_URL}/api/users",
         params=params
     )
 
-    return jsonify(data), status_code
+    return etag_response(data, status_code, etag)
 
 
 @app.route('/users/<int:user_id>', methods=['GET'])
+@cached_response(RESPONSE_CACHE_TTL, 'users:{user_id}')
 def gateway_get_user(user_id):
-    data, status_code = make_request(
+    data, status_code, etag = make_versioned_request(
         'GET',
-        f"{USERS_SERVICE_URL}/api/users/{user_id}"
+        f"{USERS_SERVICE_URL}/api/users/{user_id}",
+        params=fields_param()
     )
 
-    return jsonify(data), status_code
+    return etag_response(data, status_code, etag)
 
 
 @app.route('/users', methods=['POST'])
+@invalidates('users')
 def gateway_create_user():
     input_data = request.get_json()
 
@@ -109,6 +331,7 @@ def gateway_create_user():
 
 
 @app.route('/users/<int:user_id>', methods=['PUT'])
+@invalidates('users', 'users:{user_id}')
 def gateway_update_user(user_id):
     input_data = request.get_json()
 
@@ -122,6 +345,7 @@ def gateway_update_user(user_id):
 
 
 @app.route('/users/<int:user_id>', methods=['DELETE'])
+@invalidates('users', 'users:{user_id}')
 def gateway_delete_user(user_id):
     data, status_code = make_request(
         'DELETE',
@@ -132,42 +356,48 @@ def gateway_delete_user(user_id):
 
 
 @app.route('/users/stats', methods=['GET'])
+@cached_response(RESPONSE_CACHE_STATS_TTL, 'users')
 def gateway_users_stats():
-    data, status_code = make_request(
+    data, status_code, etag = make_versioned_request(
         'GET',
         f"{USERS_SERVICE_URL}/api/users/statistics/summary"
     )
 
-    return jsonify(data), status_code
+    return etag_response(data, status_code, etag)
 
 @app.route('/orders', methods=['GET'])
+@cached_response(RESPONSE_CACHE_TTL, 'orders')
 def gateway_list_orders():
     params = {}
     if request.args.get('user_id'):
         params['user_id'] = request.args.get('user_id')
     if request.args.get('status'):
         params['status'] = request.args.get('status')
+    params.update(fields_param())
 
-    data, status_code = make_request(
+    data, status_code, etag = make_versioned_request(
         'GET',
         f"{ORDERS_SERVICE_URL}/api/orders",
         params=params
     )
 
-    return jsonify(data), status_code
+    return etag_response(data, status_code, etag)
 
 
 @app.route('/orders/<int:order_id>', methods=['GET'])
+@cached_response(RESPONSE_CACHE_TTL, 'orders:{order_id}')
 def gateway_get_order(order_id):
-    data, status_code = make_request(
+    data, status_code, etag = make_versioned_request(
         'GET',
-        f"{ORDERS_SERVICE_URL}/api/orders/{order_id}"
+        f"{ORDERS_SERVICE_URL}/api/orders/{order_id}",
+        params=fields_param()
     )
 
-    return jsonify(data), status_code
+    return etag_response(data, status_code, etag)
 
 
 @app.route('/orders', methods=['POST'])
+@invalidates('orders')
 def gateway_create_order():
     input_data = request.get_json()
 
@@ -181,6 +411,7 @@ def gateway_create_order():
 
 
 @app.route('/orders/<int:order_id>', methods=['PUT'])
+@invalidates('orders', 'orders:{order_id}')
 def gateway_update_order(order_id):
     input_data = request.get_json()
 
@@ -194,6 +425,7 @@ def gateway_update_order(order_id):
 
 
 @app.route('/orders/<int:order_id>', methods=['DELETE'])
+@invalidates('orders', 'orders:{order_id}')
 def gateway_delete_order(order_id):
     data, status_code = make_request(
         'DELETE',
@@ -204,35 +436,48 @@ def gateway_delete_order(order_id):
 
 
 @app.route('/orders/user/<int:user_id>', methods=['GET'])
+@cached_response(RESPONSE_CACHE_TTL, 'orders')
 def gateway_user_orders(user_id):
-    data, status_code = make_request(
+    data, status_code, etag = make_versioned_request(
         'GET',
-        f"{ORDERS_SERVICE_URL}/api/orders/user/{user_id}"
+        f"{ORDERS_SERVICE_URL}/api/orders/user/{user_id}",
+        params=fields_param()
+    )
+
+    return etag_response(data, status_code, etag)
+
+
+@app.route('/orders/batch', methods=['POST'])
+def gateway_orders_batch():
+    input_data = request.get_json()
+
+    data, status_code = make_request(
+        'POST',
+        f"{ORDERS_SERVICE_URL}/api/orders/batch",
+        data=input_data
     )
 
     return jsonify(data), status_code
 
 
 @app.route('/orders/stats', methods=['GET'])
+@cached_response(RESPONSE_CACHE_STATS_TTL, 'orders')
 def gateway_orders_stats():
-    data, status_code = make_request(
+    data, status_code, etag = make_versioned_request(
         'GET',
         f"{ORDERS_SERVICE_URL}/api/orders/statistics/summary"
     )
 
-    return jsonify(data), status_code
+    return etag_response(data, status_code, etag)
 
 @app.route('/dashboard', methods=['GET'])
+@cached_response(RESPONSE_CACHE_STATS_TTL, 'users', 'orders')
 def gateway_dashboard():
-    users_response, users_status = make_request(
-        'GET',
-        f"{USERS_SERVICE_URL}/api/users/statistics/summary"
-    )
-
-    orders_response, orders_status = make_request(
-        'GET',
-        f"{ORDERS_SERVICE_URL}/api/orders/statistics/summary"
-    )
+    deadline = Deadline(COMPOSITION_DEADLINE)
+    (users_response, users_status), (orders_response, orders_status) = fan_out([
+        ('GET', f"{USERS_SERVICE_URL}/api/users/statistics/summary"),
+        ('GET', f"{ORDERS_SERVICE_URL}/api/orders/statistics/summary")
+    ], deadline)
 
     if users_status != 200 or orders_status != 200:
         return jsonify({
@@ -250,39 +495,56 @@ def gateway_dashboard():
 
 
 @app.route('/users-with-orders', methods=['GET'])
+@cached_response(RESPONSE_CACHE_STATS_TTL, 'users', 'orders')
 def gateway_users_with_orders():
     try:
+        deadline = Deadline(COMPOSITION_DEADLINE)
         users_response, users_status = make_request(
             'GET',
-            f"{USERS_SERVICE_URL}/api/users"
+            f"{USERS_SERVICE_URL}/api/users",
+            params=fields_param(),
+            timeout=deadline.timeout(REQUEST_TIMEOUT)
         )
 
+        if users_status == 400:
+            return jsonify(users_response), 400
         if users_status != 200:
             return jsonify({"error": "Error getting users"}), users_status
 
         users = users_response.get('users', [])
-        result = []
+        orders_response, orders_status = make_request(
+            'POST',
+            f"{ORDERS_SERVICE_URL}/api/orders/batch",
+            data={"user_ids": [user['id'] for user in users], **fields_param('order_fields')},
+            timeout=deadline.timeout(REQUEST_TIMEOUT)
+        )
+        if orders_status == 400:
+            return jsonify(orders_response), 400
+        orders_by_user = {}
+        if orders_status == 200:
+            orders_by_user = {entry['user_id']: entry for entry in orders_response.get('users', [])}
 
+        result = []
         for user in users:
-            user_id = user['id']
-            orders_response, orders_status = make_request(
-                'GET',
-                f"{ORDERS_SERVICE_URL}/api/orders/user/{user_id}"
-            )
-
+            user_orders = orders_by_user.get(user['id'], {})
             user_with_orders = {
                 "user": user,
-                "orders": orders_response.get('orders', []) if orders_status == 200 else [],
-                "total_orders": orders_response.get('total_orders', 0) if orders_status == 200 else 0,
-                "total_order_value": orders_response.get('total_value', 0) if orders_status == 200 else 0
+                "orders": user_orders.get('orders', []),
+                "total_orders": user_orders.get('total_orders', 0),
+                "total_order_value": user_orders.get('total_value', 0)
             }
             result.append(user_with_orders)
 
-        return jsonify({
+        response = jsonify({
             "total_users": len(users),
             "users_with_orders": result,
             "timestamp": datetime.now().isoformat()
-        }), 200
+        })
+        if orders_status != 200:
+            # Served without orders; caching it would keep hiding them after
+            # the orders service recovers.
+            response.cache_control.no_store = True
+        return response, 200
 
     except Exception as error:
         return jsonify({"error": str(error)}), 500
@@ -309,6 +571,7 @@ def documentation():
                 "GET /orders": "List all orders",
                 "GET /orders/<id>": "Get order details",
                 "GET /orders/user/<user_id>": "List user orders",
+                "POST /orders/batch": "List orders for several users at once",
                 "POST /orders": "Create new order",
                 "PUT /orders/<id>": "Update order",
                 "DELETE /orders/<id>": "Cancel order",
@@ -343,5 +606,10 @@ def method_not_allowed(error):
     }), 405
 
 
+def start_worker():
+    health_monitor.start()
+
+
 if __name__ == '__main__':
+    start_worker()
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker for one upstream.
+
+    While closed, call outcomes are kept for the last window seconds; once
+    that window holds at least failure_threshold failures and the failure
+    rate reaches failure_rate, the breaker opens and every call is rejected
+    without touching the network. After open_timeout it goes half-open and
+    lets up to half_open_probes calls through: a success closes it with a
+    clean window, a failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, failure_rate=0.5, window=30.0, open_timeout=15.0, half_open_probes=1):
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.window = window
+        self.open_timeout = open_timeout
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._outcomes = deque()
+        self._failures = 0
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._rejected = 0
+        self._trips = 0
+
+    def allow(self):
+        """Return True if a call may go out now; a half-open slot is taken if so."""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_timeout:
+                    self._rejected += 1
+                    return False
+                self._state = HALF_OPEN
+                self._probes_in_flight = 0
+
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self._rejected += 1
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._close()
+            elif self._state == CLOSED:
+                self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+            elif self._state == CLOSED:
+                self._record(False)
+                requests_in_window = len(self._outcomes)
+                if self._failures >= self.failure_threshold and self._failures / requests_in_window >= self.failure_rate:
+                    self._open()
+
+    def snapshot(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            snapshot = {
+                "state": self._state,
+                "window_requests": len(self._outcomes),
+                "window_failures": self._failures,
+                "rejected": self._rejected,
+                "trips": self._trips
+            }
+            if self._state == OPEN:
+                snapshot["retry_in"] = round(max(0.0, self.open_timeout - (time.monotonic() - self._opened_at)), 3)
+            return snapshot
+
+    def _record(self, success):
+        now = time.monotonic()
+        self._outcomes.append((now, success))
+        if not success:
+            self._failures += 1
+        self._expire(now)
+
+    def _expire(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, success = self._outcomes.popleft()
+            if not success:
+                self._failures -= 1
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trips += 1
+
+    def _close(self):
+        self._state = CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+        self._opened_at = None
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per upstream host, created on first use with the shared settings."""
+
+    def __init__(self, **settings):
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def for_url(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(**self._settings)
+                self._breakers[host] = breaker
+            return breaker
+
+    def snapshot(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: breaker.snapshot() for host, breaker in breakers.items()}
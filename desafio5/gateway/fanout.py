@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Deadline:
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, per_call_timeout):
+        """Per-call timeout clipped to what is left of the deadline."""
+        return min(per_call_timeout, self.remaining())
+
+
+class FanOut:
+    """
+    Runs upstream calls concurrently on a shared thread pool.
+
+    At most max_concurrency calls of one fan-out are in flight at a time, each
+    call gets min(per_call_timeout, time left) as its timeout, and calls still
+    unfinished when the deadline expires are reported with timeout_result.
+    """
+
+    def __init__(self, max_workers, max_concurrency):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout')
+        self.max_concurrency = max_concurrency
+
+    def run(self, tasks, deadline, per_call_timeout, timeout_result):
+        """Call each task(timeout=...) and return their results in order."""
+        results = [timeout_result] * len(tasks)
+        pending = {}
+        next_index = 0
+
+        while next_index < len(tasks) or pending:
+            while next_index < len(tasks) and len(pending) < self.max_concurrency and deadline.remaining() > 0:
+                future = self._executor.submit(tasks[next_index], timeout=deadline.timeout(per_call_timeout))
+                pending[future] = next_index
+                next_index += 1
+
+            remaining = deadline.remaining()
+            if not pending or remaining <= 0:
+                break
+
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+
+        for future in pending:
+            future.cancel()
+        return results
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class HealthMonitor:
+    """
+    Probes upstream health endpoints in the background and keeps the latest
+    result of each one, so /health is answered from memory.
+
+    checks maps a name to a URL. Every interval seconds all checks run in
+    parallel through probe(url, timeout), which must return
+    (data, status_code); an exception counts as a failed probe. Each check
+    keeps its last result and the last history_size outcomes. A result older
+    than three intervals is reported as stale and unhealthy, which covers a
+    monitor thread that stopped running.
+
+    The thread is started lazily by snapshot() as well as by start(), so a
+    worker process forked after import still gets its own monitor; until
+    the first round finishes, snapshot() waits for it (at most one probe
+    timeout).
+    """
+
+    def __init__(self, checks, probe, interval=5.0, timeout=2.0, history_size=20):
+        self.checks = dict(checks)
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._executor = None
+        self._ready = threading.Event()
+        self._results = {}
+        self._checked_at = {}
+        self._history = {name: deque(maxlen=history_size) for name in self.checks}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=len(self.checks), thread_name_prefix='health')
+            self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+            self._thread.start()
+
+    def check_now(self):
+        """Probe every upstream once, in parallel, and store the results."""
+        futures = {name: self._executor.submit(self._probe, url) for name, url in self.checks.items()}
+        for name, future in futures.items():
+            result = future.result()
+            with self._lock:
+                self._results[name] = result
+                self._checked_at[name] = time.monotonic()
+                self._history[name].append({
+                    "healthy": result["healthy"],
+                    "latency_ms": result["latency_ms"],
+                    "checked_at": result["checked_at"]
+                })
+        self._ready.set()
+
+    def snapshot(self):
+        """Latest result per check, with its history."""
+        self.start()
+        self._ready.wait(self.timeout + 1)
+
+        now = time.monotonic()
+        with self._lock:
+            snapshot = {}
+            for name, url in self.checks.items():
+                if name not in self._results:
+                    snapshot[name] = {"url": url, "healthy": False, "stale": True, "history": []}
+                    continue
+                result = dict(self._results[name])
+                age = now - self._checked_at[name]
+                result["age_seconds"] = round(age, 3)
+                result["stale"] = age > 3 * self.interval
+                if result["stale"]:
+                    result["healthy"] = False
+                result["history"] = list(self._history[name])
+                snapshot[name] = result
+            return snapshot
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                self.check_now()
+            except Exception as error:
+                print(f"Error running health checks: {error}")
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _probe(self, url):
+        started = time.monotonic()
+        try:
+            data, status_code = self.probe(url, self.timeout)
+            error = None
+        except Exception as probe_error:
+            data, status_code = None, None
+            error = str(probe_error)
+        latency = time.monotonic() - started
+
+        result = {
+            "url": url,
+            "healthy": status_code == 200,
+            "status_code": status_code,
+            "latency_ms": round(latency * 1000, 2),
+            "checked_at": datetime.now().isoformat(),
+            "info": data
+        }
+        if error:
+            result["error"] = error
+        return result
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    In-process LRU cache for upstream GET responses.
+
+    Entries are keyed by the caller (method, path and normalized query) and
+    expire after their own TTL. Each entry is tagged with the resources it was
+    built from (e.g. "users", "users:3"); invalidate() bumps the generation of
+    a tag, and entries stored under an older generation are treated as misses
+    and dropped. Generations are read before the upstream call, so a response
+    that was in flight while a write went through is never served afterwards.
+    At most max_entries are kept; the least recently used one is evicted first.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "invalidated": 0,
+            "evictions": 0,
+            "invalidations": 0
+        }
+
+    def generations(self, tags):
+        """Snapshot of the current generation of each tag, to pass to set()."""
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            value, expires_at, tags, generations = entry
+            if time.monotonic() >= expires_at:
+                reason = "expired"
+            elif any(self._generations.get(tag, 0) != generation for tag, generation in zip(tags, generations)):
+                reason = "invalidated"
+            else:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return value
+
+            del self._entries[key]
+            self._counters[reason] += 1
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key, value, ttl, tags=(), generations=None):
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generations is None:
+                generations = tuple(self._generations.get(tag, 0) for tag in tags)
+            self._entries[key] = (value, time.monotonic() + ttl, tuple(tags), generations)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = len(self._entries)
+        counters["max_entries"] = self.max_entries
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = round(counters["hits"] / lookups, 4) if lookups else 0
+        return counters
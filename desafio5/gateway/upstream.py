@@ -0,0 +1,103 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def parse_pool_sizes(value):
+    """Parse "host:port=size,host:port=size" into a dict; empty or missing gives {}."""
+    sizes = {}
+    for entry in (value or '').split(','):
+        if entry.strip():
+            host, size = entry.rsplit('=', 1)
+            sizes[host.strip()] = int(size)
+    return sizes
+
+
+class UpstreamSessions:
+    """
+    One keep-alive requests.Session per upstream host.
+
+    Each session mounts an HTTPAdapter whose urllib3 pool keeps up to
+    pool_size idle connections to that host (overridable per host with
+    pool_sizes), so repeated calls reuse TCP connections instead of opening
+    a new one per request. Sessions are created lazily and shared by all
+    threads; the upstreams do not set cookies, which is the only
+    per-session state requests mutates.
+
+    If observe is given, it is called after every request with
+    (host, method, outcome, seconds), where outcome is the status class
+    ("2xx", "5xx", ...) or "error" when no response arrived.
+    """
+
+    def __init__(self, pool_size=10, pool_sizes=None, pool_block=False, observe=None):
+        self.pool_size = pool_size
+        self.pool_sizes = pool_sizes or {}
+        self.pool_block = pool_block
+        self.observe = observe
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def session_for(self, url):
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._create_session(host)
+                    self._sessions[host] = session
+        return session
+
+    def request(self, method, url, **kwargs):
+        session = self.session_for(url)
+        if self.observe is None:
+            return session.request(method, url, **kwargs)
+
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = session.request(method, url, **kwargs)
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        finally:
+            self.observe(urlsplit(url).netloc, method, outcome, time.perf_counter() - started)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def metrics(self):
+        """Connections opened vs reused, per upstream host."""
+        with self._lock:
+            sessions = dict(self._sessions)
+
+        result = {}
+        for host, session in sessions.items():
+            opened = 0
+            requests_sent = 0
+            adapter = session.get_adapter(f"http://{host}")
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    requests_sent += pool.num_requests
+            result[host] = {
+                "pool_size": self.pool_sizes.get(host, self.pool_size),
+                "requests": requests_sent,
+                "connections_opened": opened,
+                "connections_reused": max(requests_sent - opened, 0)
+            }
+        return result
+
+    def _create_session(self, host):
+        pool_size = self.pool_sizes.get(host, self.pool_size)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=self.pool_block)
+        session = requests.Session()
+        # Calls stay inside the compose network, where compressing costs
+        # both sides more CPU than it saves in transfer time.
+        session.headers['Accept-Encoding'] = 'identity'
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
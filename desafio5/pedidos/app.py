@@ -1,9 +1,24 @@
 from flask import Flask, jsonify, request
 from datetime import datetime, timedelta
+import math
+import os
+
+from compression import use_compression
+from etags import versioned_json
+from metrics import instrument
+from order_store import OrderStore, money_to_float, to_money
+from projection import fields_variant, parse_fields, project
+from serialization import use_json_codec
 
 app = Flask(__name__)
+instrument(app)
+json_codec = use_json_codec(app, os.getenv('JSON_BACKEND', 'auto'))
+use_compression(app, int(os.getenv('COMPRESSION_MIN_SIZE', 1024)), int(os.getenv('COMPRESSION_LEVEL', 6)))
+
+# Fields a ?fields= projection may ask for.
+ORDER_FIELDS = ('id', 'user_id', 'order_date', 'status', 'total', 'items')
 
-ORDERS = [
+ORDERS = OrderStore([
     {
         "id": 101,
         "user_id": 1,
@@ -54,7 +69,7 @@ ORDERS = [
             {"product": "Monitor 27\"", "quantity": 1, "price": 199.99}
         ]
     }
-]
+])
 
 
 @app.route('/health', methods=['GET'])
@@ -69,25 +84,32 @@ def health():
 @app.route('/api/orders', methods=['GET'])
 def list_orders():
     try:
-        orders = ORDERS.copy()
-
+        user_id_int = None
         user_id_param = request.args.get('user_id')
         if user_id_param:
             try:
                 user_id_int = int(user_id_param)
-                orders = [order for order in orders if order['user_id'] == user_id_int]
             except ValueError:
                 return jsonify({"error": "user_id must be a number"}), 400
 
         status_param = request.args.get('status')
-        if status_param:
-            orders = [order for order in orders if order['status'].lower() == status_param.lower()]
 
-        return jsonify({
-            "total": len(orders),
-            "orders": orders,
-            "timestamp": datetime.now().isoformat()
-        }), 200
+        try:
+            fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+        version, modified_at = ORDERS.version()
+
+        def build():
+            orders = ORDERS.filter(user_id=user_id_int, status=status_param or None, fields=fields)
+            return {
+                "total": len(orders),
+                "orders": orders,
+                "timestamp": modified_at.isoformat()
+            }
+
+        return versioned_json(version, build, fields_variant(fields))
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 
@@ -95,14 +117,21 @@ def list_orders():
 @app.route('/api/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     try:
-        order = next((order for order in ORDERS if order['id'] == order_id), None)
-        if not order:
+        try:
+            fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+        item_version = ORDERS.item_version(order_id)
+        order = ORDERS.get(order_id)
+        if not order or not item_version:
             return jsonify({"error": f"Order {order_id} not found"}), 404
 
-        return jsonify({
-            "order": order,
-            "timestamp": datetime.now().isoformat()
-        }), 200
+        version, modified_at = item_version
+        return versioned_json(version, lambda: {
+            "order": project(order, fields),
+            "timestamp": modified_at.isoformat()
+        }, fields_variant(fields))
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 
@@ -115,23 +144,36 @@ def create_order():
         if not data or 'user_id' not in data or 'items' not in data:
             return jsonify({"error": "user_id and items are required"}), 400
 
+        if not isinstance(data['user_id'], int) or isinstance(data['user_id'], bool):
+            return jsonify({"error": "user_id must be a number"}), 400
+
         if not isinstance(data['items'], list) or len(data['items']) == 0:
             return jsonify({"error": "items must be a non-empty list"}), 400
 
-        new_id = max([order['id'] for order in ORDERS]) + 1
-
-        total = sum(item.get('quantity', 1) * item.get('price', 0) for item in data['items'])
-
-        new_order = {
-            "id": new_id,
+        for item in data['items']:
+            if not isinstance(item, dict) or any(
+                not isinstance(item.get(field, 0), (int, float)) or isinstance(item.get(field), bool)
+                for field in ('quantity', 'price')
+            ):
+                return jsonify({"error": "each item must have numeric quantity and price"}), 400
+
+        total = sum(
+            to_money(item.get('quantity', 1)) * to_money(item.get('price', 0))
+            for item in data['items']
+        )
+        if not total.is_finite():
+            return jsonify({"error": "total must be a finite number"}), 400
+        total = money_to_float(total)
+        if not math.isfinite(total):
+            return jsonify({"error": "total is too large"}), 400
+
+        new_order = ORDERS.create({
             "user_id": data['user_id'],
             "order_date": datetime.now().isoformat(),
             "status": "pending",
-            "total": round(total, 2),
+            "total": total,
             "items": data['items']
-        }
-
-        ORDERS.append(new_order)
+        })
 
         return jsonify({
             "message": "Order created successfully",
@@ -145,7 +187,7 @@ def create_order():
 @app.route('/api/orders/<int:order_id>', methods=['PUT'])
 def update_order(order_id):
     try:
-        order = next((order for order in ORDERS if order['id'] == order_id), None)
+        order = ORDERS.get(order_id)
         if not order:
             return jsonify({"error": f"Order {order_id} not found"}), 404
 
@@ -155,7 +197,7 @@ def update_order(order_id):
             valid_statuses = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
             if data['status'] not in valid_statuses:
                 return jsonify({"error": f"Invalid status. Valid: {valid_statuses}"}), 400
-            order['status'] = data['status']
+            order = ORDERS.set_status(order_id, data['status'])
 
         return jsonify({
             "message": "Order updated successfully",
@@ -169,14 +211,14 @@ def update_order(order_id):
 @app.route('/api/orders/<int:order_id>', methods=['DELETE'])
 def cancel_order(order_id):
     try:
-        order = next((order for order in ORDERS if order['id'] == order_id), None)
+        order = ORDERS.get(order_id)
         if not order:
             return jsonify({"error": f"Order {order_id} not found"}), 404
 
         if order['status'] == 'delivered':
             return jsonify({"error": "Cannot cancel delivered order"}), 409
 
-        order['status'] = 'cancelled'
+        order = ORDERS.set_status(order_id, 'cancelled')
 
         return jsonify({
             "message": f"Order {order_id} cancelled successfully",
@@ -190,13 +232,63 @@ def cancel_order(order_id):
 @app.route('/api/orders/user/<int:user_id>', methods=['GET'])
 def list_user_orders(user_id):
     try:
-        user_orders = [order for order in ORDERS if order['user_id'] == user_id]
+        try:
+            fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+        version, modified_at = ORDERS.version()
+
+        def build():
+            user_orders = ORDERS.filter(user_id=user_id, fields=fields)
+            total_orders, total_value = ORDERS.user_summary(user_id)
+            return {
+                "user_id": user_id,
+                "total_orders": total_orders,
+                "orders": user_orders,
+                "total_value": money_to_float(total_value),
+                "timestamp": modified_at.isoformat()
+            }
+
+        return versioned_json(version, build, fields_variant(fields))
+    except Exception as error:
+        return jsonify({"error": str(error)}), 500
+
+
+@app.route('/api/orders/batch', methods=['POST'])
+def batch_user_orders():
+    try:
+        data = request.get_json(silent=True)
+
+        if not isinstance(data, dict):
+            return jsonify({"error": "Body must be a JSON object"}), 400
+        if not isinstance(data.get('user_ids'), list):
+            return jsonify({"error": "user_ids must be a list"}), 400
+
+        user_ids = data['user_ids']
+        if any(not isinstance(user_id, int) or isinstance(user_id, bool) for user_id in user_ids):
+            return jsonify({"error": "user_ids must contain only numbers"}), 400
+
+        try:
+            fields = parse_fields(data.get('fields'), ORDER_FIELDS)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+        user_ids = list(dict.fromkeys(user_ids))
+
+        users = []
+        for user_id in user_ids:
+            total_orders, total_value = ORDERS.user_summary(user_id)
+            users.append({
+                "user_id": user_id,
+                "total_orders": total_orders,
+                "orders": ORDERS.filter(user_id=user_id, fields=fields),
+                "total_value": money_to_float(total_value)
+            })
 
         return jsonify({
-            "user_id": user_id,
-            "total_orders": len(user_orders),
-            "orders": user_orders,
-            "total_value": round(sum(order['total'] for order in user_orders), 2),
+            "total_users": len(user_ids),
+            "users": users,
             "timestamp": datetime.now().isoformat()
         }), 200
     except Exception as error:
@@ -206,21 +298,25 @@ def list_user_orders(user_id):
 @app.route('/api/orders/statistics/summary', methods=['GET'])
 def order_statistics():
     try:
-        total = len(ORDERS)
-        total_value = sum(order['total'] for order in ORDERS)
-
-        status_distribution = {}
-        for order in ORDERS:
-            status = order['status']
-            status_distribution[status] = status_distribution.get(status, 0) + 1
-
-        return jsonify({
-            "total_orders": total,
-            "total_value": round(total_value, 2),
-            "average_value": round(total_value / total, 2) if total > 0 else 0,
-            "status_distribution": status_distribution,
-            "timestamp": datetime.now().isoformat()
-        }), 200
+        version, modified_at = ORDERS.version()
+        verify = request.args.get('verify', '').lower() == 'true'
+
+        def build():
+            total, total_value, status_distribution, status_values = ORDERS.summary()
+
+            response = {
+                "total_orders": total,
+                "total_value": money_to_float(total_value),
+                "average_value": money_to_float(total_value / total) if total > 0 else 0,
+                "status_distribution": status_distribution,
+                "status_values": {status: money_to_float(value) for status, value in status_values.items()},
+                "timestamp": modified_at.isoformat()
+            }
+            if verify:
+                response["consistency"] = ORDERS.check_consistency()
+            return response
+
+        return versioned_json(version, build, 'verify' if verify else None)
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 
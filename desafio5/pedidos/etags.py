@@ -0,0 +1,41 @@
+import uuid
+
+from flask import current_app, jsonify, request
+
+from compression import matching_etag
+
+# Version counters restart with the process; the epoch keeps an ETag from a
+# previous run from matching a different body that got the same counter.
+EPOCH = uuid.uuid4().hex[:8]
+
+
+def make_etag(version, variant=None):
+    etag = f"{EPOCH}-{version}"
+    return f"{etag}-{variant}" if variant else etag
+
+
+def versioned_json(version, build, variant=None):
+    """
+    Answer a GET for a resource at version with a strong ETag: 304 Not
+    Modified when If-None-Match already names it, otherwise jsonify(build()).
+    variant tells apart different bodies of the same version, e.g. a
+    ?fields= projection.
+
+    build() must produce the same body for the same version, so it must not
+    embed the current time. Read the version before the data it describes:
+    a write in between then only costs the client one extra full response,
+    never a 304 for a body it does not have.
+
+    A client holding a compressed copy sends the tag with the encoding
+    appended (see compression.py); the 304 echoes the tag it sent.
+    """
+    etag = make_etag(version, variant)
+    held = matching_etag(request.if_none_match, etag)
+    if held is not None:
+        response = current_app.response_class(status=304)
+        response.set_etag(held)
+    else:
+        response = jsonify(build())
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,218 @@
+import threading
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Context, Decimal
+
+from projection import project
+
+CENT = Decimal('0.01')
+
+
+def to_money(value):
+    """Exact decimal for a JSON number (goes through str so 0.1 stays 0.1)."""
+    return Decimal(str(value))
+
+
+def money_to_float(value):
+    """
+    value rounded half up to cents, as a float. The context holds every digit
+    of the result (plus one for a carry, 9.995 -> 10.00), so totals past the
+    default 28-digit precision round instead of raising InvalidOperation.
+    """
+    context = Context(prec=max(value.adjusted(), 0) + 4)
+    return float(value.quantize(CENT, rounding=ROUND_HALF_UP, context=context))
+
+
+class OrderStore:
+    """
+    In-memory order table with a primary index by id and secondary indexes
+    by user_id and by (lower-cased) status.
+
+    The status index is moved in set_status(), so listing one user's or one
+    status's orders only touches that bucket. Ids come from a monotonic
+    counter and are never reused.
+
+    Global, per-status and per-user counts and values are kept as running
+    Decimal aggregates, so summaries are O(1) in the number of orders and
+    match a full recompute exactly.
+
+    Every write also bumps a collection version, and records it as the
+    version of the order it touched, for ETags.
+    """
+
+    def __init__(self, orders=()):
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_user = {}
+        self._by_status = {}
+        self._next_id = 1
+
+        self._total_value = Decimal('0')
+        self._status_counts = {}
+        self._status_values = {}
+        self._user_counts = {}
+        self._user_values = {}
+
+        self._version = 0
+        self._modified_at = datetime.now()
+        self._item_versions = {}
+
+        for order in orders:
+            self._insert(dict(order))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def all(self):
+        with self._lock:
+            return list(self._by_id.values())
+
+    def get(self, order_id):
+        return self._by_id.get(order_id)
+
+    def version(self):
+        """Return (version, modified_at) of the last write to any order."""
+        with self._lock:
+            return self._version, self._modified_at
+
+    def item_version(self, order_id):
+        """Return (version, modified_at) of the last write to one order, or None if it does not exist."""
+        return self._item_versions.get(order_id)
+
+    def filter(self, user_id=None, status=None, fields=None):
+        """
+        Orders matching every given criterion, in id order. With fields, only
+        those are copied, so leaving out "items" skips the nested lists.
+        """
+        with self._lock:
+            buckets = []
+            if user_id is not None:
+                buckets.append(self._by_user.get(user_id, {}))
+            if status is not None:
+                buckets.append(self._by_status.get(status.lower(), {}))
+            if not buckets:
+                orders = self._by_id.values()
+            else:
+                buckets.sort(key=len)
+                smallest, others = buckets[0], buckets[1:]
+                ids = [order_id for order_id in smallest if all(order_id in bucket for bucket in others)]
+                orders = [self._by_id[order_id] for order_id in sorted(ids)]
+
+            if fields is None:
+                return list(orders)
+            return [project(order, fields) for order in orders]
+
+    def summary(self):
+        """Return (count, total_value, status_counts, status_values) with Decimal values."""
+        with self._lock:
+            return (
+                len(self._by_id),
+                self._total_value,
+                dict(self._status_counts),
+                dict(self._status_values)
+            )
+
+    def user_summary(self, user_id):
+        """Return (order_count, lifetime_value) for one user."""
+        with self._lock:
+            return self._user_counts.get(user_id, 0), self._user_values.get(user_id, Decimal('0'))
+
+    def check_consistency(self):
+        """Recompute every aggregate from the orders and report any drift from the running values."""
+        with self._lock:
+            expected_status_counts = {}
+            expected_status_values = {}
+            expected_user_counts = {}
+            expected_user_values = {}
+            for order in self._by_id.values():
+                total = to_money(order['total'])
+                expected_status_counts[order['status']] = expected_status_counts.get(order['status'], 0) + 1
+                expected_status_values[order['status']] = expected_status_values.get(order['status'], Decimal('0')) + total
+                expected_user_counts[order['user_id']] = expected_user_counts.get(order['user_id'], 0) + 1
+                expected_user_values[order['user_id']] = expected_user_values.get(order['user_id'], Decimal('0')) + total
+
+            expected = {
+                "total_value": sum(expected_status_values.values(), Decimal('0')),
+                "status_counts": expected_status_counts,
+                "status_values": expected_status_values,
+                "user_counts": expected_user_counts,
+                "user_values": expected_user_values
+            }
+            actual = {
+                "total_value": self._total_value,
+                "status_counts": dict(self._status_counts),
+                "status_values": dict(self._status_values),
+                "user_counts": dict(self._user_counts),
+                "user_values": dict(self._user_values)
+            }
+
+        drift = {
+            name: {"expected": str(expected[name]), "actual": str(actual[name])}
+            for name in expected
+            if expected[name] != actual[name]
+        }
+        return {"consistent": not drift, "drift": drift}
+
+    def create(self, fields):
+        """Insert a new order with the next id; fields must not contain 'id'."""
+        with self._lock:
+            order = {"id": self._next_id}
+            order.update(fields)
+            self._insert(order)
+            return order
+
+    def set_status(self, order_id, status):
+        """Change an order's status and move it between status buckets. Returns None if not found."""
+        with self._lock:
+            order = self._by_id.get(order_id)
+            if order is None:
+                return None
+            self._discard(self._by_status, order['status'].lower(), order_id)
+            self._add_status(order['status'], -1, -to_money(order['total']))
+            order['status'] = status
+            self._by_status.setdefault(status.lower(), {})[order_id] = None
+            self._add_status(status, 1, to_money(order['total']))
+            self._touch(order_id)
+            return order
+
+    def _insert(self, order):
+        # Everything that can raise on a bad value runs before the first
+        # write, and the order becomes visible in _by_id only once it is
+        # fully indexed.
+        order_id = order['id']
+        user_id = order['user_id']
+        status_key = order['status'].lower()
+        total = to_money(order['total'])
+        hash(user_id)
+
+        self._next_id = max(self._next_id, order_id + 1)
+        self._by_user.setdefault(user_id, {})[order_id] = None
+        self._by_status.setdefault(status_key, {})[order_id] = None
+
+        self._total_value += total
+        self._add_status(order['status'], 1, total)
+        self._user_counts[user_id] = self._user_counts.get(user_id, 0) + 1
+        self._user_values[user_id] = self._user_values.get(user_id, Decimal('0')) + total
+        self._by_id[order_id] = order
+        self._touch(order_id)
+
+    def _touch(self, order_id):
+        self._version += 1
+        self._modified_at = datetime.now()
+        self._item_versions[order_id] = (self._version, self._modified_at)
+
+    def _add_status(self, status, count, value):
+        remaining = self._status_counts.get(status, 0) + count
+        if remaining:
+            self._status_counts[status] = remaining
+            self._status_values[status] = self._status_values.get(status, Decimal('0')) + value
+        else:
+            self._status_counts.pop(status, None)
+            self._status_values.pop(status, None)
+
+    @staticmethod
+    def _discard(index, key, order_id):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(order_id, None)
+            if not bucket:
+                del index[key]
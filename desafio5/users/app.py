@@ -1,9 +1,23 @@
 from flask import Flask, jsonify, request
 from datetime import datetime, timedelta
+import os
+
+from compression import use_compression
+from etags import versioned_json
+from metrics import instrument
+from projection import fields_variant, parse_fields, project
+from serialization import use_json_codec
+from user_store import EmailAlreadyRegistered, UserStore
 
 app = Flask(__name__)
+instrument(app)
+json_codec = use_json_codec(app, os.getenv('JSON_BACKEND', 'auto'))
+use_compression(app, int(os.getenv('COMPRESSION_MIN_SIZE', 1024)), int(os.getenv('COMPRESSION_LEVEL', 6)))
+
+# Fields a ?fields= projection may ask for.
+USER_FIELDS = ('id', 'name', 'email', 'active', 'profile', 'registration_date')
 
-USERS = [
+USERS = UserStore([
     {
         "id": 1,
         "name": "Alice Silva",
@@ -44,7 +58,17 @@ USERS = [
         "registration_date": (datetime.now() - timedelta(days=7)).isoformat(),
         "profile": "client"
     }
-]
+], profile_key=str.lower)
+
+
+def invalid_user_field(fields):
+    """The reason a create or update body cannot be stored, or None."""
+    for name in ('name', 'email', 'profile'):
+        if name in fields and not isinstance(fields[name], str):
+            return f"{name} must be a string"
+    if 'active' in fields and not isinstance(fields['active'], bool):
+        return "active must be true or false"
+    return None
 
 
 @app.route('/health', methods=['GET'])
@@ -59,22 +83,27 @@ def health():
 @app.route('/api/users', methods=['GET'])
 def list_users():
     try:
-        users = USERS.copy()
-
         active_param = request.args.get('active')
-        if active_param:
-            active_bool = active_param.lower() == 'true'
-            users = [user for user in users if user['active'] == active_bool]
+        active_bool = active_param.lower() == 'true' if active_param else None
 
         profile_param = request.args.get('profile')
-        if profile_param:
-            users = [user for user in users if user['profile'].lower() == profile_param.lower()]
 
-        return jsonify({
-            "total": len(users),
-            "users": users,
-            "timestamp": datetime.now().isoformat()
-        }), 200
+        try:
+            fields = parse_fields(request.args.get('fields'), USER_FIELDS)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+        version, modified_at = USERS.version()
+
+        def build():
+            users = USERS.filter(active=active_bool, profile=profile_param or None, fields=fields)
+            return {
+                "total": len(users),
+                "users": users,
+                "timestamp": modified_at.isoformat()
+            }
+
+        return versioned_json(version, build, fields_variant(fields))
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 
@@ -82,14 +111,21 @@ def list_users():
 @app.route('/api/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     try:
-        user = next((user for user in USERS if user['id'] == user_id), None)
-        if not user:
+        try:
+            fields = parse_fields(request.args.get('fields'), USER_FIELDS)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+        item_version = USERS.item_version(user_id)
+        user = USERS.get(user_id)
+        if not user or not item_version:
             return jsonify({"error": f"User {user_id} not found"}), 404
 
-        return jsonify({
-            "user": user,
-            "timestamp": datetime.now().isoformat()
-        }), 200
+        version, modified_at = item_version
+        return versioned_json(version, lambda: {
+            "user": project(user, fields),
+            "timestamp": modified_at.isoformat()
+        }, fields_variant(fields))
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 
@@ -102,21 +138,21 @@ def create_user():
         if not data or 'name' not in data or 'email' not in data:
             return jsonify({"error": "Name and email are required"}), 400
 
-        if any(user['email'] == data['email'] for user in USERS):
-            return jsonify({"error": "Email already registered"}), 409
-
-        new_id = max([user['id'] for user in USERS]) + 1
-
-        new_user = {
-            "id": new_id,
+        fields = {
             "name": data['name'],
             "email": data['email'],
             "active": data.get('active', True),
             "registration_date": datetime.now().isoformat(),
             "profile": data.get('profile', 'client')
         }
+        error = invalid_user_field(fields)
+        if error:
+            return jsonify({"error": error}), 400
 
-        USERS.append(new_user)
+        try:
+            new_user = USERS.create(fields)
+        except EmailAlreadyRegistered:
+            return jsonify({"error": "Email already registered"}), 409
 
         return jsonify({
             "message": "User created successfully",
@@ -130,22 +166,21 @@ def create_user():
 @app.route('/api/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
     try:
-        user = next((user for user in USERS if user['id'] == user_id), None)
-        if not user:
+        if not USERS.get(user_id):
             return jsonify({"error": f"User {user_id} not found"}), 404
 
         data = request.get_json()
-
-        if 'name' in data:
-            user['name'] = data['name']
-        if 'email' in data:
-            if any(user['id'] != user_id and user['email'] == data['email'] for user in USERS):
-                return jsonify({"error": "Email already registered"}), 409
-            user['email'] = data['email']
-        if 'active' in data:
-            user['active'] = data['active']
-        if 'profile' in data:
-            user['profile'] = data['profile']
+        changes = {field: data[field] for field in ('name', 'email', 'active', 'profile') if field in data}
+        error = invalid_user_field(changes)
+        if error:
+            return jsonify({"error": error}), 400
+
+        try:
+            user = USERS.update(user_id, changes)
+        except EmailAlreadyRegistered:
+            return jsonify({"error": "Email already registered"}), 409
+        if not user:
+            return jsonify({"error": f"User {user_id} not found"}), 404
 
         return jsonify({
             "message": "User updated successfully",
@@ -159,12 +194,10 @@ def update_user(user_id):
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     try:
-        user = next((user for user in USERS if user['id'] == user_id), None)
+        user = USERS.delete(user_id)
         if not user:
             return jsonify({"error": f"User {user_id} not found"}), 404
 
-        USERS.remove(user)
-
         return jsonify({
             "message": f"User {user_id} deleted successfully",
             "timestamp": datetime.now().isoformat()
@@ -176,23 +209,26 @@ def delete_user(user_id):
 @app.route('/api/users/statistics/summary', methods=['GET'])
 def user_statistics():
     try:
-        total = len(USERS)
-        active_users = len([user for user in USERS if user['active']])
-        inactive_users = total - active_users
-
-        profiles = {}
-        for user in USERS:
-            profile = user['profile']
-            profiles[profile] = profiles.get(profile, 0) + 1
-
-        return jsonify({
-            "total_users": total,
-            "active_users": active_users,
-            "inactive_users": inactive_users,
-            "active_percentage": round((active_users / total * 100) if total > 0 else 0, 2),
-            "profile_distribution": profiles,
-            "timestamp": datetime.now().isoformat()
-        }), 200
+        version, modified_at = USERS.version()
+        verify = request.args.get('verify', '').lower() == 'true'
+
+        def build():
+            total, active_users, profiles = USERS.summary()
+            inactive_users = total - active_users
+
+            response = {
+                "total_users": total,
+                "active_users": active_users,
+                "inactive_users": inactive_users,
+                "active_percentage": round((active_users / total * 100) if total > 0 else 0, 2),
+                "profile_distribution": profiles,
+                "timestamp": modified_at.isoformat()
+            }
+            if verify:
+                response["consistency"] = USERS.check_consistency()
+            return response
+
+        return versioned_json(version, build, 'verify' if verify else None)
     except Exception as error:
         return jsonify({"error": str(error)}), 500
 